@@ -0,0 +1,193 @@
+"""
+Linux kernel crypto API (AF_ALG) hashing backend.
+
+Hashes are computed by the kernel through an AF_ALG socket instead of by
+hashlib in user space. Objects returned by an AfAlgConstructor behave like
+hashlib objects (update, digest, hexdigest), so they fit into
+HASH_ALGORITHMS and the regular read loops. They also offer
+update_from_fd(), which splices file data straight from the page cache into
+the kernel hasher, so it never enters Python at all.
+
+On hosts with crypto offload engines this can beat user-space hashing; on
+plain CPUs hashlib is usually faster. The backend is detected at runtime and
+is simply unavailable on non-Linux platforms or kernels without AF_ALG.
+"""
+
+import hashlib
+import os
+import socket
+import stat
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no fcntl (nor AF_ALG)
+    fcntl = None
+
+
+# Kernel crypto API names for the algorithms in HASH_ALGORITHMS
+KERNEL_NAMES = {
+    "MD5": "md5",
+    "SHA1": "sha1",
+    "SHA256": "sha256",
+    "SHA384": "sha384",
+    "SHA512": "sha512",
+    "BLAKE2b": "blake2b-512",
+    "BLAKE2s": "blake2s-256",
+    "SHA3_256": "sha3-256",
+    "SHA3_384": "sha3-384",
+    "SHA3_512": "sha3-512",
+}
+
+# Pipe size requested for splicing; larger pipes mean fewer system calls
+SPLICE_PIPE_SIZE = 1024 * 1024
+
+
+def _bind(kernel_name: str) -> socket.socket:
+    """Open an AF_ALG transform socket bound to a hash algorithm."""
+    tfm = socket.socket(socket.AF_ALG, socket.SOCK_SEQPACKET, 0)
+    try:
+        tfm.bind(("hash", kernel_name))
+    except OSError:
+        tfm.close()
+        raise
+    return tfm
+
+
+def afalg_available(kernel_name: str) -> bool:
+    """Check whether the kernel offers a hash algorithm through AF_ALG."""
+    if not hasattr(socket, "AF_ALG"):
+        return False
+    try:
+        _bind(kernel_name).close()
+    except OSError:
+        return False
+    return True
+
+
+class AfAlgHash:
+    """
+    A running kernel hash with the hashlib object interface.
+
+    The digest can only be read once; the sockets are closed after it.
+    """
+
+    def __init__(self, tfm: socket.socket, name: str, digest_size: int, data=b""):
+        self.name = name
+        self.digest_size = digest_size
+        self._op, _ = tfm.accept()
+        self._digest = None
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        """Send the next chunk to the kernel; MSG_MORE keeps the hash open."""
+        if self._digest is not None:
+            raise ValueError("AF_ALG hash cannot be updated after digest()")
+        self._op.sendall(data, socket.MSG_MORE)
+
+    def update_from_fd(self, fd: int) -> bool:
+        """
+        Hash a whole regular file by splicing it into the kernel hasher.
+
+        The data moves from the page cache through a pipe into the AF_ALG
+        socket without being copied into user space. Returns False without
+        reading anything if the file is not a regular file or the platform
+        cannot splice; the caller should then fall back to update().
+        """
+        if self._digest is not None:
+            raise ValueError("AF_ALG hash cannot be updated after digest()")
+        if not hasattr(os, "splice"):
+            return False
+        st = os.fstat(fd)
+        if not stat.S_ISREG(st.st_mode):
+            return False
+
+        read_end, write_end = os.pipe()
+        try:
+            pipe_size = 64 * 1024
+            if fcntl is not None and hasattr(fcntl, "F_SETPIPE_SZ"):
+                try:
+                    pipe_size = fcntl.fcntl(write_end, fcntl.F_SETPIPE_SZ, SPLICE_PIPE_SIZE)
+                except OSError:
+                    pass
+
+            offset = 0
+            while True:
+                n = os.splice(fd, write_end, pipe_size, offset_src=offset)
+                if n == 0:
+                    break
+                offset += n
+                sent = 0
+                while sent < n:
+                    sent += os.splice(
+                        read_end, self._op.fileno(), n - sent, flags=os.SPLICE_F_MORE
+                    )
+        finally:
+            os.close(read_end)
+            os.close(write_end)
+        return True
+
+    def digest(self) -> bytes:
+        if self._digest is None:
+            # Reading from the operation socket finalizes the hash
+            self._digest = self._op.recv(self.digest_size)
+            self._op.close()
+        return self._digest
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+
+class AfAlgConstructor:
+    """
+    Picklable hashlib-style constructor for one kernel algorithm.
+
+    The transform socket is opened lazily per process and shared by all
+    hash objects created from it.
+    """
+
+    def __init__(self, name: str, kernel_name: str, digest_size: int):
+        self.name = name
+        self.kernel_name = kernel_name
+        self.digest_size = digest_size
+        self._tfm = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_tfm"] = None
+        return state
+
+    def __call__(self, data=b"") -> AfAlgHash:
+        if self._tfm is None:
+            self._tfm = _bind(self.kernel_name)
+        return AfAlgHash(self._tfm, self.name.lower(), self.digest_size, data)
+
+    def __repr__(self):
+        return f"AfAlgConstructor({self.kernel_name!r})"
+
+
+def kernel_constructor(name: str, reference=None) -> Optional[AfAlgConstructor]:
+    """
+    Build an AF_ALG constructor for a registry algorithm, if the kernel has it.
+
+    Args:
+        name: Algorithm name as used in HASH_ALGORITHMS
+        reference: hashlib constructor for the same algorithm, used to learn
+            the digest size (default: hashlib.new(name))
+    """
+    kernel_name = KERNEL_NAMES.get(name)
+    if kernel_name is None or not afalg_available(kernel_name):
+        return None
+    reference = reference or (lambda: hashlib.new(name.lower()))
+    digest_size = reference().digest_size
+    return AfAlgConstructor(name, kernel_name, digest_size)
+
+
+def kernel_constructors(hash_funcs: Dict) -> Dict:
+    """Swap every algorithm the kernel offers for its AF_ALG constructor."""
+    return {
+        name: kernel_constructor(name, hash_func) or hash_func
+        for name, hash_func in hash_funcs.items()
+    }
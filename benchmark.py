@@ -0,0 +1,620 @@
+#!/usr/bin/env python3
+"""
+Hashing Benchmarks
+Measures throughput of the hashing paths in hash_core.py on synthetic files.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import datetime
+import json
+import mmap
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from afalg import kernel_constructor
+from hash_index import KnownHashIndex, build_index
+from hash_core import (
+    HASH_ALGORITHMS,
+    ReadOptions,
+    _update_from_mmap,
+    _update_from_reads,
+    calculate_hash,
+    calculate_hashes,
+    choose_chunk_size,
+    iter_hashes,
+)
+
+# Chunk sizes compared by the "chunks" benchmark
+CHUNK_SIZES = [4 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 8 * 1024 * 1024]
+
+# Default file sizes for the "suite" benchmark
+SUITE_SIZES = "1K,64K,1M,64M,1G"
+
+# Version of the suite's result format. Version 1 understated iter_hashes
+# throughput by counting only one file per worker; those results are not
+# compared with later ones.
+SUITE_FORMAT = 2
+
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+# Relative change reported as a regression or improvement by "compare"
+COMPARE_THRESHOLD = 0.05
+
+
+def make_test_file(directory: Path, size: int) -> Path:
+    """Create a file of the given size filled with random data."""
+    path = directory / f"bench_{size}.bin"
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:min(remaining, len(block))])
+            remaining -= len(block)
+    return path
+
+
+def make_sparse_file(directory: Path, size: int, index: int = 0) -> Path:
+    """Create a file of the given size that is one big hole (no disk blocks)."""
+    path = directory / f"sparse_{size}_{index}.bin"
+    with open(path, "wb") as f:
+        f.truncate(size)
+    return path
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as 64K, 10G or 4096 into bytes."""
+    text = text.strip().upper().rstrip("IB")
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def drop_page_cache(path: Path) -> bool:
+    """Evict a file's pages from the page cache, if the platform allows it."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def resident_bytes(path: Path) -> Optional[int]:
+    """
+    Bytes of a file currently in the page cache, via mincore(2).
+
+    Returns None where mincore is unavailable (non-Linux/BSD platforms).
+    """
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, "mincore"):
+        return None
+
+    size = os.stat(path).st_size
+    if size == 0:
+        return 0
+    page = mmap.PAGESIZE
+    pages = -(-size // page)
+    vec = (ctypes.c_ubyte * pages)()
+    with open(path, "rb") as f:
+        # A private mapping is writable from Python's side, which ctypes
+        # needs to take its address; no pages are touched or copied
+        mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_COPY)
+        try:
+            anchor = ctypes.c_char.from_buffer(mapped)
+            address = ctypes.addressof(anchor)
+            result = libc.mincore(ctypes.c_void_p(address), ctypes.c_size_t(size), vec)
+            del anchor
+        finally:
+            mapped.close()
+    if result != 0:
+        return None
+    return sum(1 for v in vec if v & 1) * page
+
+
+def time_call(func: Callable, repeat: int, setup: Optional[Callable] = None) -> float:
+    """Return the best wall-clock time of several calls to func."""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_threads(args):
+    """Compare the sequential multi-digest pass against the threaded fan-out."""
+    hash_funcs = dict(HASH_ALGORITHMS.values())
+    size = args.size_mb * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_test_file(Path(tmp), size)
+
+        print("=" * 60)
+        print(f"Multi-digest fan-out: {args.size_mb} MiB, {os.cpu_count()} CPU(s)")
+        print("=" * 60)
+
+        sequential = time_call(lambda: calculate_hashes(path, hash_funcs), args.repeat)
+        threaded = time_call(
+            lambda: calculate_hashes(path, hash_funcs, threaded=True), args.repeat
+        )
+        slowest = max(
+            time_call(lambda: calculate_hashes(path, {name: func}), args.repeat)
+            for name, func in hash_funcs.items()
+        )
+
+        mib = size / (1024 * 1024)
+        print(f"  Sequential:        {sequential:8.3f}s  {mib / sequential:8.1f} MiB/s")
+        print(f"  Threaded:          {threaded:8.3f}s  {mib / threaded:8.1f} MiB/s")
+        print(f"  Slowest algorithm: {slowest:8.3f}s  {mib / slowest:8.1f} MiB/s")
+        print(f"  Speedup:           {sequential / threaded:8.2f}x")
+        print("=" * 60)
+
+
+def format_size(size: int) -> str:
+    """Format a byte count as KiB or MiB."""
+    if size >= 1024 * 1024:
+        return f"{size // (1024 * 1024)} MiB"
+    return f"{size // 1024} KiB"
+
+
+def bench_chunks(args):
+    """Compare read buffer sizes (and the mmap path) for every algorithm."""
+    size = args.size_mb * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_test_file(Path(tmp), size)
+        auto_size = choose_chunk_size(size, os.stat(path).st_blksize)
+
+        def read_with(hash_func, chunk_size):
+            with open(path, "rb", buffering=0) as f:
+                _update_from_reads(f, [hash_func()], chunk_size)
+
+        def read_mmap(hash_func):
+            with open(path, "rb", buffering=0) as f:
+                _update_from_mmap(f, [hash_func()])
+
+        columns = [format_size(c) for c in CHUNK_SIZES]
+        columns += [f"auto ({format_size(auto_size)})", "mmap"]
+        print("=" * 60)
+        print(f"Throughput by chunk size in MiB/s: {args.size_mb} MiB file")
+        print("=" * 60)
+        print(f"{'Algorithm':<10}" + "".join(f"{c:>16}" for c in columns))
+
+        mib = size / (1024 * 1024)
+        for name, hash_func in HASH_ALGORITHMS.values():
+            timings = [
+                time_call(lambda c=c: read_with(hash_func, c), args.repeat)
+                for c in CHUNK_SIZES + [auto_size]
+            ]
+            timings.append(time_call(lambda: read_mmap(hash_func), args.repeat))
+            print(f"{name:<10}" + "".join(f"{mib / t:>16.1f}" for t in timings))
+        print("=" * 60)
+
+
+def bench_cache(args):
+    """Show how much of a hashed file stays in the page cache, per read mode."""
+    size = args.size_mb * 1024 * 1024
+    sha256 = {"SHA256": HASH_ALGORITHMS["3"][1]}
+    modes = [
+        ("default (mmap)", ReadOptions()),
+        ("--no-cache-pollution", ReadOptions(no_cache_pollution=True)),
+        (
+            "--no-cache-pollution --queue-depth 8",
+            ReadOptions(queue_depth=8, no_cache_pollution=True)
+        ),
+    ]
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        path = make_test_file(Path(tmp), size)
+
+        print("=" * 60)
+        print(f"Page cache footprint of hashing a {args.size_mb} MiB file")
+        print("=" * 60)
+        for label, options in modes:
+            drop_page_cache(path)
+            before = resident_bytes(path)
+            if before is None:
+                print("mincore() is not available on this platform")
+                return
+            start = time.perf_counter()
+            calculate_hashes(path, sha256, options=options)
+            seconds = time.perf_counter() - start
+            after = resident_bytes(path)
+            print(
+                f"  {label:<38} cached before: {before / (1024 * 1024):7.1f} MiB  "
+                f"after: {after / (1024 * 1024):7.1f} MiB  ({args.size_mb / seconds:.0f} MiB/s)"
+            )
+        print("=" * 60)
+
+
+def bench_afalg(args):
+    """Compare hashlib with the AF_ALG kernel backend, copying and zero-copy."""
+    size = args.size_mb * 1024 * 1024
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        path = make_test_file(Path(tmp), size)
+
+        def via_update(hash_func):
+            hash_obj = hash_func()
+            with open(path, "rb", buffering=0) as f:
+                _update_from_reads(f, [hash_obj])
+            hash_obj.hexdigest()
+
+        print("=" * 60)
+        print(f"hashlib vs. AF_ALG in MiB/s: {args.size_mb} MiB file")
+        print("=" * 60)
+        print(f"{'Algorithm':<10}{'hashlib':>12}{'AF_ALG copy':>14}{'AF_ALG splice':>16}")
+
+        mib = size / (1024 * 1024)
+        found = False
+        for name, hash_func in HASH_ALGORITHMS.values():
+            kernel_func = kernel_constructor(name, hash_func)
+            if kernel_func is None:
+                continue
+            found = True
+            user = time_call(lambda: calculate_hash(path, hash_func), args.repeat)
+            copy = time_call(lambda: via_update(kernel_func), args.repeat)
+            splice = time_call(lambda: calculate_hash(path, kernel_func), args.repeat)
+            print(f"{name:<10}{mib / user:>12.1f}{mib / copy:>14.1f}{mib / splice:>16.1f}")
+        if not found:
+            print("AF_ALG hashing is not available on this host")
+        print("=" * 60)
+
+
+def random_digests(count: int, seed: int, digest_size: int = 32):
+    """Yield reproducible random digests, without holding them in memory."""
+    rng = random.Random(seed)
+    block_count = 4096
+    while count > 0:
+        n = min(count, block_count)
+        block = rng.randbytes(n * digest_size)
+        for offset in range(0, len(block), digest_size):
+            yield block[offset:offset + digest_size]
+        count -= n
+
+
+def bench_index(args):
+    """Build a known-hash index of random SHA256 digests and time lookups."""
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        path = Path(tmp) / "bench.idx"
+
+        print("=" * 60)
+        print(f"Known-hash index: {args.entries:,} SHA256 digests")
+        print("=" * 60)
+        start = time.perf_counter()
+        count = build_index(path, random_digests(args.entries, seed=1), "sha256")
+        seconds = time.perf_counter() - start
+        size = path.stat().st_size
+        print(f"  Build:         {seconds:10.1f} s  ({count / seconds:,.0f} digests/s)")
+        print(f"  Index size:    {format_size(size):>10}  ({size / max(count, 1):.1f} bytes/digest)")
+
+        queries = min(args.queries, count)
+        with KnownHashIndex(path) as index:
+            hits = list(random_digests(queries, seed=1))
+            misses = list(random_digests(queries, seed=2))
+            hit_time = time_call(lambda: all(d in index for d in hits), args.repeat)
+            miss_time = time_call(lambda: any(d in index for d in misses), args.repeat)
+            passed = sum(index.might_contain(d) for d in misses)
+            print(f"  Known lookups: {queries / hit_time:10,.0f} /s")
+            print(f"  Unknown:       {queries / miss_time:10,.0f} /s")
+            print(f"  Bloom false positives: {passed / max(queries, 1):.4%}")
+        print("=" * 60)
+
+
+def suite_cases(paths: List[Path], workers: int):
+    """Yield (name, algorithm, callable) for every hashing path in the suite."""
+    path = paths[0]
+    all_funcs = dict(HASH_ALGORITHMS.values())
+    # Sparse-filled files would otherwise all take the hole-skipping reader
+    options = ReadOptions(detect_holes=False)
+
+    def read_with(hash_func):
+        with open(path, "rb", buffering=0) as f:
+            _update_from_reads(f, [hash_func()])
+
+    for name, hash_func in HASH_ALGORITHMS.values():
+        yield "calculate_hash", name, 1, lambda f=hash_func: calculate_hash(
+            path, f, options=options
+        )
+        yield "readinto", name, 1, lambda f=hash_func: read_with(f)
+
+    yield "calculate_hashes", "ALL", 1, lambda: calculate_hashes(
+        path, all_funcs, options=options
+    )
+    yield "calculate_hashes_threaded", "ALL", 1, lambda: calculate_hashes(
+        path, all_funcs, threaded=True
+    )
+
+    sha256 = {"SHA256": HASH_ALGORITHMS["3"][1]}
+    yield "sparse_holes", "SHA256", 1, lambda: calculate_hashes(path, sha256)
+    for depth in (4, 16):
+        yield f"prefetch_qd{depth}", "SHA256", 1, lambda d=depth: calculate_hashes(
+            path, sha256, options=ReadOptions(queue_depth=d, detect_holes=False)
+        )
+    # Every worker count hashes all the files, so the runs do equal work
+    for count in range(1, workers + 1):
+        yield "iter_hashes", "SHA256", count, lambda c=count: list(
+            iter_hashes(paths, sha256, c, options=options)
+        )
+
+
+def bench_suite(args):
+    """Run every hashing path over a range of sizes and record JSON results."""
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    workers = args.workers or (os.cpu_count() or 1)
+    caches = ["warm", "cold"] if args.cold else ["warm"]
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "fill": args.fill,
+            "repeat": args.repeat,
+            "format": SUITE_FORMAT,
+        },
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for size in sizes:
+            # One file per worker so the pool has independent files to hash
+            if args.fill == "sparse":
+                paths = [make_sparse_file(Path(tmp), size, i) for i in range(workers)]
+            else:
+                paths = [make_test_file(Path(tmp), size)]
+                for i in range(1, workers):
+                    copy = Path(tmp) / f"bench_{size}_{i}.bin"
+                    os.link(paths[0], copy)
+                    paths.append(copy)
+
+            for case, algorithm, count, func in suite_cases(paths, workers):
+                for cache in caches:
+                    setup = None
+                    if cache == "cold":
+                        setup = lambda: [drop_page_cache(p) for p in paths]
+                    seconds = time_call(func, args.repeat, setup)
+                    total = size * (len(paths) if case == "iter_hashes" else 1)
+                    result = {
+                        "path": case,
+                        "algorithm": algorithm,
+                        "size": size,
+                        "cache": cache,
+                        "workers": count,
+                        "seconds": seconds,
+                        "mib_per_s": total / (1024 * 1024) / seconds if seconds else None,
+                    }
+                    report["results"].append(result)
+                    print(
+                        f"{case:<26} {algorithm:<7} {size:>14} B  {cache:<5} "
+                        f"x{count:<3} {result['mib_per_s'] or 0:10.1f} MiB/s",
+                        file=sys.stderr
+                    )
+
+            for path in paths:
+                path.unlink()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+def result_key(result: dict) -> tuple:
+    """Identify a measurement across runs."""
+    return (result["path"], result["algorithm"], result["size"], result["cache"], result["workers"])
+
+
+def bench_compare(args):
+    """Compare two suite result files and flag throughput changes."""
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline_report = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current_report = json.load(f)
+    baseline = {result_key(r): r for r in baseline_report["results"]}
+    current = {result_key(r): r for r in current_report["results"]}
+
+    formats = {
+        report["meta"].get("format", 1) for report in (baseline_report, current_report)
+    }
+    if 1 in formats and len(formats) > 1:
+        # Format 1 measured iter_hashes differently; those numbers do not compare
+        print("Skipping iter_hashes: results from suite format 1 are not comparable")
+        baseline = {key: r for key, r in baseline.items() if key[0] != "iter_hashes"}
+        current = {key: r for key, r in current.items() if key[0] != "iter_hashes"}
+
+    regressions = 0
+    print("=" * 60)
+    print(f"Baseline: {args.baseline}")
+    print(f"Current:  {args.current}")
+    print("=" * 60)
+    for key in sorted(baseline.keys() & current.keys()):
+        before = baseline[key]["mib_per_s"]
+        after = current[key]["mib_per_s"]
+        if not before or not after:
+            continue
+        change = after / before - 1
+        flag = ""
+        if change <= -args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change >= args.threshold:
+            flag = "  faster"
+        path, algorithm, size, cache, workers = key
+        print(
+            f"{path:<26} {algorithm:<7} {size:>14} B  {cache:<5} x{workers:<3} "
+            f"{before:10.1f} -> {after:10.1f} MiB/s  {change:+7.1%}{flag}"
+        )
+    for key in sorted(baseline.keys() - current.keys()):
+        print(f"Only in baseline: {key}")
+    for key in sorted(current.keys() - baseline.keys()):
+        print(f"Only in current:  {key}")
+    print("=" * 60)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the hashing paths of the File Hash Generator"
+    )
+    parser.add_argument(
+        "-r", "--repeat",
+        type=int,
+        default=3,
+        help="Number of runs per measurement, best is reported (default: 3)"
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    threads_parser = subparsers.add_parser(
+        "threads", help="Sequential vs. thread-per-algorithm multi-digest hashing"
+    )
+    threads_parser.add_argument(
+        "--size-mb",
+        type=int,
+        default=512,
+        help="Size of the synthetic test file in MiB (default: 512)"
+    )
+    threads_parser.set_defaults(func=bench_threads)
+
+    chunks_parser = subparsers.add_parser(
+        "chunks", help="Throughput across read buffer sizes for every algorithm"
+    )
+    chunks_parser.add_argument(
+        "--size-mb",
+        type=int,
+        default=256,
+        help="Size of the synthetic test file in MiB (default: 256)"
+    )
+    chunks_parser.set_defaults(func=bench_chunks)
+
+    cache_parser = subparsers.add_parser(
+        "cache", help="Page cache footprint with and without --no-cache-pollution"
+    )
+    cache_parser.add_argument(
+        "--size-mb",
+        type=int,
+        default=256,
+        help="Size of the synthetic test file in MiB (default: 256)"
+    )
+    cache_parser.add_argument(
+        "--dir",
+        help="Directory for the test file; use real storage, not tmpfs "
+             "(default: system temp directory)"
+    )
+    cache_parser.set_defaults(func=bench_cache)
+
+    afalg_parser = subparsers.add_parser(
+        "afalg", help="hashlib vs. the AF_ALG kernel crypto backend"
+    )
+    afalg_parser.add_argument(
+        "--size-mb",
+        type=int,
+        default=256,
+        help="Size of the synthetic test file in MiB (default: 256)"
+    )
+    afalg_parser.add_argument(
+        "--dir",
+        help="Directory for the test file (default: system temp directory)"
+    )
+    afalg_parser.set_defaults(func=bench_afalg)
+
+    index_parser = subparsers.add_parser(
+        "index", help="Known-hash index build time and lookup throughput"
+    )
+    index_parser.add_argument(
+        "--entries",
+        type=int,
+        default=100_000_000,
+        help="Number of digests in the index (default: 100000000)"
+    )
+    index_parser.add_argument(
+        "--queries",
+        type=int,
+        default=200_000,
+        help="Lookups timed for known and for unknown digests (default: 200000)"
+    )
+    index_parser.add_argument(
+        "--dir",
+        help="Directory for the index and its sort runs (default: system temp directory)"
+    )
+    index_parser.set_defaults(func=bench_index)
+
+    suite_parser = subparsers.add_parser(
+        "suite", help="Every hashing path, algorithm, size and worker count, as JSON"
+    )
+    suite_parser.add_argument(
+        "--sizes",
+        default=SUITE_SIZES,
+        help=f"Comma-separated file sizes, e.g. 1K,1M,10G (default: {SUITE_SIZES})"
+    )
+    suite_parser.add_argument(
+        "--fill",
+        choices=["sparse", "random"],
+        default="sparse",
+        help="sparse: files are holes, measuring hashing without disk I/O; "
+             "random: files are written with random data (default: sparse)"
+    )
+    suite_parser.add_argument(
+        "--cold",
+        action="store_true",
+        help="Also measure with the files evicted from the page cache before each run"
+    )
+    suite_parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=0,
+        help="Measure the worker pool from 1 to N workers (default: CPU count)"
+    )
+    suite_parser.add_argument(
+        "--dir",
+        help="Directory for the synthetic files (default: system temp directory)"
+    )
+    suite_parser.add_argument(
+        "-o", "--output",
+        default="bench_results.json",
+        help="JSON file to write results to (default: bench_results.json)"
+    )
+    suite_parser.set_defaults(func=bench_suite)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Diff two suite result files"
+    )
+    compare_parser.add_argument("baseline", help="Baseline results JSON")
+    compare_parser.add_argument("current", help="Current results JSON")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=COMPARE_THRESHOLD,
+        help=f"Relative change flagged as a regression (default: {COMPARE_THRESHOLD})"
+    )
+    compare_parser.set_defaults(func=bench_compare)
+
+    args = parser.parse_args()
+    if args.repeat < 1:
+        print("Error: --repeat must be at least 1")
+        sys.exit(1)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Content-defined chunking for cross-file deduplication analysis.
+
+Files are split into variable-size chunks whose boundaries depend only on
+the bytes around them, so an insertion early in a file shifts the chunk
+boundaries along with the data instead of changing every later chunk.
+Hashing the chunks then shows how much of a file set is duplicated.
+
+The rolling fingerprint is table-driven and runs in C: every byte is mapped
+to one bit through a fixed 256-entry table with bytes.translate(), and a
+boundary is placed right after each occurrence of a fixed bit pattern,
+found with bytes.find(). With an n-bit pattern this is a rolling hash over
+an n-byte window that matches with probability 2^-n, the same principle as
+Gear/Rabin chunking with an n-bit mask, but without a Python-level loop
+over bytes. Minimum and maximum chunk sizes bound the result as usual.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator
+
+
+DEFAULT_AVG_CHUNK_SIZE = 8 * 1024
+
+# Bytes read from a file per refill of the chunker
+READ_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def _make_table() -> bytes:
+    """
+    Map each byte value to b"0" or b"1", half of each, deterministically.
+
+    The assignment is derived from SHA256 so it never changes between
+    Python versions, keeping chunk boundaries reproducible.
+    """
+    order = sorted(
+        range(256), key=lambda b: hashlib.sha256(b"cdc-v1" + bytes([b])).digest()
+    )
+    ones = set(order[:128])
+    return bytes(ord("1") if b in ones else ord("0") for b in range(256))
+
+
+BIT_TABLE = _make_table()
+
+
+class Chunker:
+    """
+    Split byte streams into content-defined chunks.
+
+    Args:
+        avg_size: Average chunk size on random data; must be a power of two
+        min_size: Smallest chunk except the last one (default: avg_size / 2);
+            avg_size - min_size must be a power of two
+        max_size: Largest chunk (default: avg_size * 8)
+    """
+
+    def __init__(
+        self,
+        avg_size: int = DEFAULT_AVG_CHUNK_SIZE,
+        min_size: int = 0,
+        max_size: int = 0
+    ):
+        if avg_size < 64 or avg_size & (avg_size - 1):
+            raise ValueError("Average chunk size must be a power of two, at least 64")
+        self.avg_size = avg_size
+        self.min_size = min_size or avg_size // 2
+        self.max_size = max_size or avg_size * 8
+        if not 0 < self.min_size < self.avg_size < self.max_size:
+            raise ValueError("Chunk sizes must satisfy 0 < min < avg < max")
+        # "10...0" cannot overlap itself, so once the search starts at the
+        # minimum size, the pattern completes after 2^bits bytes on average
+        # and chunks average exactly min + 2^bits = avg bytes.
+        gap = self.avg_size - self.min_size
+        if gap < 4 or gap & (gap - 1):
+            raise ValueError("Average minus minimum chunk size must be a power of two, at least 4")
+        bits = gap.bit_length() - 1
+        self.pattern = b"1" + b"0" * (bits - 1)
+
+    def _cut(self, fingerprint: bytes, start: int, length: int, final: bool) -> int:
+        """
+        Find the end of the chunk starting at start, or -1 if more data is needed.
+        """
+        width = len(self.pattern)
+        lo = start + self.min_size
+        hi = start + self.max_size
+        index = fingerprint.find(self.pattern, lo, hi)
+        if index != -1:
+            return index + width
+        if length - start >= self.max_size:
+            return start + self.max_size
+        if final and length > start:
+            return length
+        return -1
+
+    def iter_chunks(self, blocks: Iterable[bytes]) -> Iterator[bytes]:
+        """Yield the chunks of a stream given as consecutive blocks of bytes."""
+        pending = b""
+        for block in blocks:
+            pending += block
+            fingerprint = pending.translate(BIT_TABLE)
+            start = 0
+            while True:
+                end = self._cut(fingerprint, start, len(pending), final=False)
+                if end == -1:
+                    break
+                yield pending[start:end]
+                start = end
+            pending = pending[start:]
+
+        fingerprint = pending.translate(BIT_TABLE)
+        start = 0
+        while start < len(pending):
+            end = self._cut(fingerprint, start, len(pending), final=True)
+            yield pending[start:end]
+            start = end
+
+    def iter_file_chunks(self, file_path: Path) -> Iterator[bytes]:
+        """Yield the chunks of a file."""
+        try:
+            with open(file_path, "rb") as f:
+                yield from self.iter_chunks(iter(lambda: f.read(READ_BLOCK_SIZE), b""))
+        except IOError as e:
+            raise IOError(f"Error reading file: {e}")
+
+
+def analyze_dedup(
+    paths: Iterable[Path],
+    hash_func: Callable,
+    chunker: Chunker,
+    errors: list
+) -> Dict:
+    """
+    Chunk a set of files and measure how much of the data is duplicated.
+
+    Args:
+        paths: Files to analyze
+        hash_func: Hash constructor identifying chunks
+        chunker: Chunker defining the chunk boundaries
+        errors: List that receives {"path", "error"} entries for unreadable files
+
+    Returns:
+        Dictionary with file, chunk and byte counts, unique counts, the
+        dedup ratio (total bytes / unique bytes), the configured chunk sizes
+        and the measured average chunk size
+    """
+    seen = set()
+    files = chunks = unique_chunks = total_bytes = unique_bytes = 0
+
+    for path in paths:
+        try:
+            for chunk in chunker.iter_file_chunks(path):
+                chunks += 1
+                total_bytes += len(chunk)
+                digest = hash_func(chunk).digest()
+                if digest not in seen:
+                    seen.add(digest)
+                    unique_chunks += 1
+                    unique_bytes += len(chunk)
+        except IOError as e:
+            errors.append({"path": str(path), "error": str(e)})
+            continue
+        files += 1
+
+    return {
+        "files": files,
+        "chunks": chunks,
+        "unique_chunks": unique_chunks,
+        "bytes": total_bytes,
+        "unique_bytes": unique_bytes,
+        "dedup_ratio": total_bytes / unique_bytes if unique_bytes else 1.0,
+        "avg_chunk_size": chunker.avg_size,
+        "measured_avg_chunk_size": round(total_bytes / chunks) if chunks else 0,
+        "min_chunk_size": chunker.min_size,
+        "max_chunk_size": chunker.max_size,
+    }
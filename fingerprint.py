@@ -0,0 +1,114 @@
+"""
+Sampled fingerprints for fast change detection.
+
+A fingerprint hashes a file's size plus a few fixed-position samples
+instead of its whole content, so a first-pass scan of a huge archive reads
+megabytes instead of terabytes. Any change to the size or to a sampled
+region changes the fingerprint. Changes elsewhere in the file do not, so a
+fingerprint is NOT a full-content digest and is never a substitute for one
+when integrity matters.
+
+Format, version 1 ("fp-v1"):
+
+- With n samples of s bytes and a file of size bytes: if size <= n * s the
+  whole file is read as one sample; otherwise sample i (0 <= i < n) is the
+  s bytes at offset (i * (size - s)) // (n - 1), so the first sample is the
+  head, the last is the tail and the rest are spaced evenly in between.
+- Digest: H(size as 8-byte big-endian || sample 0 || ... || sample n-1)
+- Written as "fp-v1:<algorithm>:<n>:<s>:<hex digest>", with the algorithm
+  name in lower case, e.g. "fp-v1:sha256:8:65536:9f86d0...".
+"""
+
+import os
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+
+FINGERPRINT_VERSION = 1
+
+DEFAULT_SAMPLES = 8
+DEFAULT_SAMPLE_SIZE = 64 * 1024
+
+
+def sample_offsets(size: int, samples: int, sample_size: int) -> List[Tuple[int, int]]:
+    """(offset, length) of every sample read for a file of the given size."""
+    if samples < 2 or sample_size <= 0:
+        raise ValueError("Fingerprints need at least 2 samples of a positive size")
+    if size <= samples * sample_size:
+        return [(0, size)]
+    span = size - sample_size
+    return [((i * span) // (samples - 1), sample_size) for i in range(samples)]
+
+
+def fingerprint_file(
+    file_path: Path,
+    hash_func: Callable,
+    samples: int = DEFAULT_SAMPLES,
+    sample_size: int = DEFAULT_SAMPLE_SIZE
+) -> bytes:
+    """
+    Compute the fp-v1 fingerprint of a file.
+
+    Args:
+        file_path: Path to the file
+        hash_func: Hash constructor
+        samples: Number of samples, at least 2 (head and tail)
+        sample_size: Bytes per sample
+
+    Returns:
+        Raw fingerprint digest
+    """
+    try:
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            size = os.fstat(fd).st_size
+            hash_obj = hash_func(size.to_bytes(8, "big"))
+            for offset, length in sample_offsets(size, samples, sample_size):
+                while length > 0:
+                    if hasattr(os, "pread"):
+                        data = os.pread(fd, length, offset)
+                    else:
+                        os.lseek(fd, offset, os.SEEK_SET)
+                        data = os.read(fd, length)
+                    if not data:
+                        raise IOError(f"{file_path}: file shrank while sampling")
+                    hash_obj.update(data)
+                    offset += len(data)
+                    length -= len(data)
+            return hash_obj.digest()
+        finally:
+            os.close(fd)
+    except IOError as e:
+        raise IOError(f"Error reading file: {e}")
+
+
+def format_fingerprint(algorithm: str, samples: int, sample_size: int, digest: bytes) -> str:
+    """Format a fingerprint with the parameters needed to recompute it."""
+    return (
+        f"fp-v{FINGERPRINT_VERSION}:{algorithm.lower()}:{samples}:{sample_size}:{digest.hex()}"
+    )
+
+
+def parse_fingerprint(text: str) -> Tuple[str, int, int, str]:
+    """
+    Parse a formatted fingerprint.
+
+    Returns:
+        (algorithm name, samples, sample size, hex digest)
+
+    Raises:
+        ValueError: If the text is not a fingerprint of a supported version
+    """
+    parts = text.strip().split(":")
+    if len(parts) != 5 or not parts[0].startswith("fp-v"):
+        raise ValueError(f"Not a fingerprint: {text!r}")
+    version, algorithm, samples, sample_size, digest = parts
+    if version != f"fp-v{FINGERPRINT_VERSION}":
+        raise ValueError(f"Unsupported fingerprint version: {version}")
+    try:
+        samples = int(samples)
+        sample_size = int(sample_size)
+        int(digest, 16)
+    except ValueError:
+        raise ValueError(f"Not a fingerprint: {text!r}")
+    return algorithm, samples, sample_size, digest.lower()
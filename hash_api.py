@@ -0,0 +1,184 @@
+"""
+Importable hashing API for the File Hash Generator.
+
+These functions return structured results and never print or prompt, so
+Python services can hash files in-process instead of running main.py and
+parsing its output:
+
+    from hash_api import hash_file, hash_files
+
+    result = hash_file("release.tar.gz", ["sha256", "blake2b"])
+    print(result.digests["SHA256"])
+
+    for result in hash_files(paths, "sha256", workers=8):
+        if not result.ok:
+            log.warning("%s: %s", result.path, result.error)
+
+Algorithms are given as for main.py -a: names (case-insensitive), menu
+numbers, "all", or comma-separated combinations of these. Digests are keyed
+by the canonical names in HASH_ALGORITHMS, e.g. "SHA256".
+
+Only hash_core is loaded, not the command line tool in main.py.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Union
+
+from hash_core import (
+    DEFAULT_READ_OPTIONS,
+    MIN_CHUNK_SIZE,
+    ReadOptions,
+    calculate_hashes,
+    iter_hashes,
+    resolve_algorithms,
+)
+
+
+__all__ = ["HashResult", "hash_file", "hash_files", "hash_stream"]
+
+Algorithms = Union[str, Iterable[str]]
+
+
+@dataclass(frozen=True)
+class HashResult:
+    """
+    Outcome of hashing one file or stream.
+
+    Attributes:
+        path: The file hashed, or None for a stream
+        digests: Mapping of algorithm name to hex digest, in the order
+            requested; empty if hashing failed
+        error: Why hashing failed, or None on success
+    """
+    # Declared by hand rather than with slots=True, which needs Python 3.10
+    __slots__ = ("path", "digests", "error")
+
+    path: Optional[Path]
+    digests: Dict[str, str]
+    error: Optional[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __reduce__(self):
+        # Frozen slotted instances cannot be restored attribute by attribute
+        return HashResult, (self.path, self.digests, self.error)
+
+
+def _resolve(algorithms: Algorithms) -> Dict:
+    """Resolve algorithm names, raising ValueError if none or unknown ones are given."""
+    if isinstance(algorithms, str):
+        algorithms = [algorithms]
+    hash_funcs = resolve_algorithms(algorithms)
+    if not hash_funcs:
+        raise ValueError("No hash algorithm selected")
+    return hash_funcs
+
+
+def hash_file(
+    path: Union[str, Path],
+    algorithms: Algorithms = "sha256",
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> HashResult:
+    """
+    Hash one file with one or more algorithms in a single read pass.
+
+    Args:
+        path: File to hash
+        algorithms: Algorithm name(s) (default: SHA256)
+        options: How the file is read
+
+    Returns:
+        HashResult with the digests
+
+    Raises:
+        IOError: If the file cannot be read
+        ValueError: If an algorithm is unknown
+    """
+    path = Path(path)
+    return HashResult(
+        path, calculate_hashes(path, _resolve(algorithms), options=options), None
+    )
+
+
+def hash_files(
+    paths: Iterable[Union[str, Path]],
+    algorithms: Algorithms = "sha256",
+    workers: int = 1,
+    use_processes: bool = False,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> Iterator[HashResult]:
+    """
+    Hash many files, optionally on a pool of workers.
+
+    Errors are reported per file in HashResult.error rather than raised, so
+    one unreadable file does not stop the batch. Paths are consumed lazily.
+
+    Args:
+        paths: Files to hash; directories and patterns are not expanded
+        algorithms: Algorithm name(s) (default: SHA256)
+        workers: Number of workers (0 = one per CPU, 1 = no pool)
+        use_processes: Use a process pool instead of a thread pool
+        options: How each file is read
+
+    Yields:
+        One HashResult per file; out of order when workers > 1
+
+    Raises:
+        ValueError: If an algorithm is unknown or workers is negative
+    """
+    hash_funcs = _resolve(algorithms)
+    if workers < 0:
+        raise ValueError("workers must be 0 or greater")
+    results = iter_hashes(
+        (Path(p) for p in paths), hash_funcs, workers, use_processes, options=options
+    )
+    for path, digests, error in results:
+        yield HashResult(path, digests or {}, error)
+
+
+def hash_stream(
+    stream: BinaryIO,
+    algorithms: Algorithms = "sha256",
+    chunk_size: int = MIN_CHUNK_SIZE
+) -> HashResult:
+    """
+    Hash everything readable from a binary stream, e.g. an upload or a pipe.
+
+    The stream is read to its end but not closed. Objects with readinto()
+    are read into one reusable buffer; others through read().
+
+    Args:
+        stream: Binary file-like object
+        algorithms: Algorithm name(s) (default: SHA256)
+        chunk_size: Bytes requested per read
+
+    Returns:
+        HashResult with path None
+
+    Raises:
+        IOError: If reading the stream fails
+        ValueError: If an algorithm is unknown
+    """
+    hash_objs = {name: func() for name, func in _resolve(algorithms).items()}
+    try:
+        if hasattr(stream, "readinto"):
+            buffer = bytearray(chunk_size)
+            with memoryview(buffer) as view:
+                while True:
+                    n = stream.readinto(buffer)
+                    if not n:
+                        break
+                    for hash_obj in hash_objs.values():
+                        hash_obj.update(view[:n])
+        else:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                for hash_obj in hash_objs.values():
+                    hash_obj.update(chunk)
+    except IOError as e:
+        raise IOError(f"Error reading stream: {e}")
+    return HashResult(
+        None, {name: obj.hexdigest() for name, obj in hash_objs.items()}, None
+    )
@@ -0,0 +1,310 @@
+"""
+asyncio counterparts of the hashing API.
+
+Hashing a file with hash_api.hash_file() blocks the event loop for as long
+as the file takes to read. AsyncHasher runs every read and hash update in a
+thread pool instead, one chunk per job, so the loop stays responsive and a
+task can be cancelled between chunks:
+
+    hasher = AsyncHasher(max_concurrency=8, max_inflight_bytes=64 * 1024 * 1024)
+
+    result = await hasher.hash_file("upload.bin", "sha256")
+
+    async for result in hasher.hash_files(paths, ["sha256", "md5"]):
+        ...
+
+    result = await hasher.hash_stream(request.content, "sha256")
+
+The limits apply to everything one AsyncHasher does, so share a single
+instance across the service: max_concurrency bounds the files and streams
+hashed at once, and max_inflight_bytes bounds the data being read or hashed
+at any moment.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional, Union
+
+from hash_api import Algorithms, HashResult, _resolve
+
+
+# Bytes read and hashed per executor job
+ASYNC_CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_INFLIGHT_BYTES = 64 * 1024 * 1024
+
+
+class _ByteBudget:
+    """
+    Async counting limit on bytes in flight, granted first come, first served.
+
+    release() is synchronous and must run on the event loop; pool threads
+    use release_threadsafe().
+    """
+
+    def __init__(self, limit: int, loop: asyncio.AbstractEventLoop):
+        self.limit = limit
+        self.used = 0
+        self._loop = loop
+        self._waiters = collections.deque()
+
+    def _fits(self, n: int) -> bool:
+        # A request larger than the whole budget still runs, on its own
+        return self.used == 0 or self.used + n <= self.limit
+
+    async def acquire(self, n: int):
+        if not self._waiters and self._fits(n):
+            self.used += n
+            return
+        waiter = self._loop.create_future()
+        self._waiters.append((n, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we were cancelled; hand the bytes back
+                self.release(n)
+            else:
+                if (n, waiter) in self._waiters:
+                    self._waiters.remove((n, waiter))
+                self._wake()
+            raise
+
+    def release(self, n: int):
+        self.used -= n
+        self._wake()
+
+    def release_threadsafe(self, n: int):
+        try:
+            self._loop.call_soon_threadsafe(self.release, n)
+        except RuntimeError:
+            # The loop is closed; nobody is waiting for the budget any more
+            pass
+
+    def _wake(self):
+        while self._waiters and self._fits(self._waiters[0][0]):
+            n, waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.used += n
+                waiter.set_result(None)
+
+
+def _read_and_update(f, buffer: bytearray, hash_objs: Iterable) -> int:
+    """Read the next chunk of a file into buffer and feed it to the hashers."""
+    n = f.readinto(buffer)
+    if n:
+        with memoryview(buffer) as view:
+            for hash_obj in hash_objs:
+                hash_obj.update(view[:n])
+    return n
+
+
+def _update(hash_objs: Iterable, data: bytes):
+    for hash_obj in hash_objs:
+        hash_obj.update(data)
+
+
+class AsyncHasher:
+    """
+    Hash files and streams from asyncio code without blocking the loop.
+
+    Args:
+        max_concurrency: Files and streams hashed at the same time
+        max_inflight_bytes: Bytes being read or hashed at the same time
+        chunk_size: Bytes read and hashed per executor job
+        executor: Thread pool to run jobs on (default: a private pool with
+            max_concurrency threads, shut down by close())
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_inflight_bytes: int = DEFAULT_MAX_INFLIGHT_BYTES,
+        chunk_size: int = ASYNC_CHUNK_SIZE,
+        executor: Optional[concurrent.futures.Executor] = None
+    ):
+        if max_concurrency <= 0 or max_inflight_bytes <= 0 or chunk_size <= 0:
+            raise ValueError("Limits and chunk size must be positive")
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.max_inflight_bytes = max_inflight_bytes
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._byte_budget = None
+        self._own_executor = executor is None
+        self._executor = executor or concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrency
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Shut down the private thread pool, if there is one."""
+        if self._own_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _budget(self) -> _ByteBudget:
+        """The byte budget, bound to the event loop on first use."""
+        loop = asyncio.get_running_loop()
+        if self._byte_budget is None or self._byte_budget._loop is not loop:
+            self._byte_budget = _ByteBudget(self.max_inflight_bytes, loop)
+        return self._byte_budget
+
+    def _submit(self, budget: _ByteBudget, n: int, func, *args) -> concurrent.futures.Future:
+        """
+        Run one job in the pool, holding n already acquired bytes of the budget.
+
+        The bytes are released when the job itself ends, not when the task
+        awaiting it does, so cancelled tasks never leave reads running
+        outside the limit.
+        """
+        job = self._executor.submit(func, *args)
+        job.add_done_callback(lambda _: budget.release_threadsafe(n))
+        return job
+
+    async def hash_file(
+        self,
+        path: Union[str, Path],
+        algorithms: Algorithms = "sha256"
+    ) -> HashResult:
+        """
+        Hash one file with one or more algorithms in a single read pass.
+
+        Raises:
+            IOError: If the file cannot be read
+            ValueError: If an algorithm is unknown
+        """
+        path = Path(path)
+        hash_funcs = _resolve(algorithms)
+        hash_objs = [func() for func in hash_funcs.values()]
+        budget = self._budget()
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            try:
+                f = await loop.run_in_executor(self._executor, open, path, "rb", 0)
+            except IOError as e:
+                raise IOError(f"Error reading file: {e}")
+            job = None
+            try:
+                buffer = bytearray(self.chunk_size)
+                while True:
+                    await budget.acquire(self.chunk_size)
+                    job = self._submit(
+                        budget, self.chunk_size, _read_and_update, f, buffer, hash_objs
+                    )
+                    n = await asyncio.wrap_future(job)
+                    if not n:
+                        break
+            except IOError as e:
+                raise IOError(f"Error reading file: {e}")
+            finally:
+                if job is None:
+                    f.close()
+                else:
+                    # After a cancellation the last job may still be reading;
+                    # close the file once it is done (immediately if it is)
+                    job.add_done_callback(lambda _: f.close())
+        return HashResult(
+            path, {name: obj.hexdigest() for name, obj in zip(hash_funcs, hash_objs)}, None
+        )
+
+    async def hash_files(
+        self,
+        paths: Iterable[Union[str, Path]],
+        algorithms: Algorithms = "sha256"
+    ) -> AsyncIterator[HashResult]:
+        """
+        Hash many files concurrently, yielding results as files finish.
+
+        Errors are reported per file in HashResult.error. Paths are consumed
+        lazily; closing or cancelling the iteration cancels the files still
+        being hashed.
+
+        Raises:
+            ValueError: If an algorithm is unknown
+        """
+        _resolve(algorithms)
+
+        async def one(path: Path) -> HashResult:
+            try:
+                return await self.hash_file(path, algorithms)
+            except IOError as e:
+                return HashResult(path, {}, str(e))
+
+        paths = iter(paths)
+        pending = set()
+        try:
+            while True:
+                # Keep a few more tasks than slots so a slot never sits idle
+                for path in paths:
+                    pending.add(asyncio.ensure_future(one(Path(path))))
+                    if len(pending) >= self.max_concurrency * 2:
+                        break
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def hash_stream(
+        self,
+        stream,
+        algorithms: Algorithms = "sha256"
+    ) -> HashResult:
+        """
+        Hash everything from an async stream, e.g. an upload body.
+
+        Args:
+            stream: Object with an async read(n) method returning b"" at the
+                end (asyncio.StreamReader), or an async iterable of bytes
+            algorithms: Algorithm name(s) (default: SHA256)
+
+        Returns:
+            HashResult with path None
+        """
+        hash_funcs = _resolve(algorithms)
+        hash_objs = [func() for func in hash_funcs.values()]
+        budget = self._budget()
+        async with self._slots:
+            if hasattr(stream, "read"):
+                chunks = None
+            else:
+                chunks = stream.__aiter__()
+            while True:
+                # Reserve the budget before reading, so buffered data counts too
+                reserved = self.chunk_size
+                await budget.acquire(reserved)
+                try:
+                    if chunks is None:
+                        data = await stream.read(self.chunk_size)
+                    else:
+                        data = await chunks.__anext__()
+                except StopAsyncIteration:
+                    data = b""
+                except BaseException:
+                    budget.release(reserved)
+                    raise
+                if not data:
+                    budget.release(reserved)
+                    break
+                if len(data) > reserved:
+                    # Iterables choose their own chunk sizes; account for all of it
+                    budget.release(reserved)
+                    reserved = len(data)
+                    await budget.acquire(reserved)
+                job = self._submit(budget, reserved, _update, hash_objs, data)
+                await asyncio.wrap_future(job)
+        return HashResult(
+            None, {name: obj.hexdigest() for name, obj in zip(hash_funcs, hash_objs)}, None
+        )
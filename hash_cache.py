@@ -0,0 +1,139 @@
+"""
+Persistent digest cache for the File Hash Generator.
+
+Digests are stored in SQLite, keyed by file identity (device, inode), size,
+modification time in nanoseconds and algorithm. A file whose key still
+matches has not changed since it was hashed, so its digest can be reused
+without reading it again.
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+# Number of writes buffered before committing to disk
+COMMIT_INTERVAL = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    algorithm TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (dev, ino, size, mtime_ns, algorithm)
+);
+CREATE INDEX IF NOT EXISTS digests_path ON digests (path);
+"""
+
+
+class HashCache:
+    """
+    SQLite-backed cache of file digests.
+
+    Lookups and stores must happen on the thread that created the cache.
+    Use as a context manager, or call close() to flush pending writes.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._pending_writes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _key(st: os.stat_result) -> tuple:
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def get(self, st: os.stat_result, algorithms: Iterable[str]) -> Optional[Dict[str, str]]:
+        """
+        Look up the digests of a file.
+
+        Args:
+            st: Result of os.stat() on the file, taken before hashing
+            algorithms: Algorithm names that are needed
+
+        Returns:
+            Mapping of algorithm name to hex digest in the order given, or
+            None (counted as a miss) unless every algorithm is cached
+        """
+        algorithms = list(algorithms)
+        rows = self.conn.execute(
+            "SELECT algorithm, digest FROM digests "
+            "WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+            self._key(st)
+        ).fetchall()
+        cached = dict(rows)
+        if not all(name in cached for name in algorithms):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {name: cached[name] for name in algorithms}
+
+    def put(self, path: Path, st: os.stat_result, digests: Dict[str, str]):
+        """
+        Store the digests of a file.
+
+        Entries for older versions of the same file are replaced, so the
+        cache holds at most one version per file and algorithm.
+        """
+        key = self._key(st)
+        path = os.path.abspath(path)
+        for algorithm, digest in digests.items():
+            self.conn.execute(
+                "DELETE FROM digests WHERE dev = ? AND ino = ? AND algorithm = ?",
+                (st.st_dev, st.st_ino, algorithm)
+            )
+            self.conn.execute(
+                "INSERT INTO digests VALUES (?, ?, ?, ?, ?, ?, ?)",
+                key + (algorithm, digest, path)
+            )
+        self._pending_writes += 1
+        if self._pending_writes >= COMMIT_INTERVAL:
+            self.conn.commit()
+            self._pending_writes = 0
+
+    def prune(self) -> int:
+        """
+        Evict entries whose files are gone or no longer match their key.
+
+        Returns:
+            Number of entries removed
+        """
+        stale = []
+        rows = self.conn.execute(
+            "SELECT rowid, path, dev, ino, size, mtime_ns FROM digests"
+        ).fetchall()
+        for rowid, path, *key in rows:
+            try:
+                st = os.stat(path)
+            except OSError:
+                stale.append((rowid,))
+                continue
+            if self._key(st) != tuple(key):
+                stale.append((rowid,))
+
+        self.conn.executemany("DELETE FROM digests WHERE rowid = ?", stale)
+        self.conn.commit()
+        self.evicted += len(stale)
+        return len(stale)
+
+    def close(self):
+        """Commit pending writes and close the database."""
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,756 @@
+"""
+Core hashing logic shared by the CLI and the library API.
+
+This module holds the algorithm registry, the file readers and the
+single-file and batch hashing functions. It never prints or prompts, and
+imports nothing from main.py, so services can use it (through hash_api)
+without loading the command line tool.
+"""
+
+import collections
+import concurrent.futures
+import errno
+import hashlib
+import mmap
+import os
+import queue
+import stat
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hash_stats import HashStats
+from piece_table import PieceTable, sidecar_path
+
+
+# Chunk size for the threaded fan-out; hashlib only releases the GIL for
+# large updates, so workers need big buffers to actually run in parallel
+THREADED_CHUNK_SIZE = 1024 * 1024
+
+# Slice size when feeding a memory-mapped file to the hashers
+MMAP_SLICE_SIZE = 1024 * 1024
+
+# Bounds for the adaptive read buffer used when a file cannot be mapped
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Request size for the prefetching reader; several of these are kept in flight
+PREFETCH_CHUNK_SIZE = 1024 * 1024
+
+# How far the read cursor moves between page cache drops in
+# --no-cache-pollution mode
+DROP_BEHIND_WINDOW = 8 * 1024 * 1024
+
+# Zeros fed to the hashers per update for holes in sparse files, preallocated
+# once so holes cost no I/O and no allocation
+SPARSE_ZERO_BLOCK = bytes(1024 * 1024)
+
+# Files per task when hashing with a process pool, to amortize IPC overhead
+PROCESS_BATCH_SIZE = 32
+
+# Top 5 hash algorithms
+HASH_ALGORITHMS = {
+    "1": ("MD5", hashlib.md5),
+    "2": ("SHA1", hashlib.sha1),
+    "3": ("SHA256", hashlib.sha256),
+    "4": ("SHA384", hashlib.sha384),
+    "5": ("SHA512", hashlib.sha512),
+}
+
+# Algorithms with practical collision attacks, never picked by --fastest-secure
+INSECURE_ALGORITHMS = {"MD5", "SHA1"}
+
+# Menu key of the "All algorithms" entry; registered algorithms skip it
+ALL_CHOICE = "6"
+
+
+def register_algorithm(name: str, hash_func: Callable) -> str:
+    """
+    Add a hash algorithm to HASH_ALGORITHMS under the next free menu number.
+
+    Args:
+        name: Display name, also accepted (case-insensitive) by -a
+        hash_func: Constructor returning a hashlib-style object
+
+    Returns:
+        The menu key assigned to the algorithm
+    """
+    number = len(HASH_ALGORITHMS) + 1
+    if number >= int(ALL_CHOICE):
+        number += 1
+    key = str(number)
+    HASH_ALGORITHMS[key] = (name, hash_func)
+    return key
+
+
+# Modern algorithms from hashlib, registered after the legacy five and the
+# "All" entry so existing menu numbers stay stable
+register_algorithm("BLAKE2b", hashlib.blake2b)
+register_algorithm("BLAKE2s", hashlib.blake2s)
+register_algorithm("SHA3_256", hashlib.sha3_256)
+register_algorithm("SHA3_384", hashlib.sha3_384)
+register_algorithm("SHA3_512", hashlib.sha3_512)
+
+
+def choose_chunk_size(file_size: int, block_size: int = 4096) -> int:
+    """
+    Pick a read buffer size for a file.
+
+    Aims for roughly 16 reads per file, bounded by MIN_CHUNK_SIZE and
+    MAX_CHUNK_SIZE and rounded up to a multiple of the filesystem block size.
+    Pipes and other files without a known size get the minimum.
+    """
+    block_size = max(block_size or 4096, 4096)
+    chunk_size = min(max(file_size // 16, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+    return -(-chunk_size // block_size) * block_size
+
+
+def _fadvise(fd: int, offset: int, length: int, advice_name: str):
+    """Give the kernel a posix_fadvise() hint, where the platform has one."""
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except OSError:
+        # Advice is best effort; some filesystems reject it
+        pass
+
+
+def _update_from_reads(
+    f,
+    hash_objs: Iterable,
+    chunk_size: Optional[int] = None,
+    drop_behind: bool = False
+):
+    """
+    Feed a file to the hashers using readinto() on one reusable buffer.
+
+    The chunk size adapts to the file size and st_blksize unless given
+    explicitly. Only a memoryview of the filled part is passed to update(),
+    so nothing is allocated per chunk. With drop_behind, pages already
+    hashed are dropped from the page cache as the cursor advances.
+    """
+    fd = f.fileno()
+    if chunk_size is None:
+        st = os.fstat(fd)
+        chunk_size = choose_chunk_size(st.st_size, getattr(st, "st_blksize", 4096))
+
+    position = dropped = 0
+    buffer = bytearray(chunk_size)
+    with memoryview(buffer) as view:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            chunk = view[:n] if n < chunk_size else view
+            for hash_obj in hash_objs:
+                hash_obj.update(chunk)
+            position += n
+            if drop_behind and position - dropped >= DROP_BEHIND_WINDOW:
+                _fadvise(fd, dropped, position - dropped, "POSIX_FADV_DONTNEED")
+                dropped = position
+    if drop_behind:
+        # Length 0 covers everything up to the end of the file
+        _fadvise(fd, dropped, 0, "POSIX_FADV_DONTNEED")
+
+
+def _update_from_mmap(f, hash_objs: Iterable) -> bool:
+    """
+    Feed a regular file to the hashers through a read-only memory map.
+
+    Memoryview slices of the mapping are passed straight to update(), so no
+    bytes objects are allocated per chunk. Returns False without consuming
+    the file when it cannot be mapped (pipes, devices, empty files, or
+    platforms without mmap); the caller should then fall back to read().
+    """
+    try:
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+            return False
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, OverflowError):
+        return False
+
+    with mapped:
+        if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        # The memoryview must be released before the mapping is closed
+        with memoryview(mapped) as view:
+            for offset in range(0, len(view), MMAP_SLICE_SIZE):
+                chunk = view[offset:offset + MMAP_SLICE_SIZE]
+                for hash_obj in hash_objs:
+                    hash_obj.update(chunk)
+                chunk.release()
+    return True
+
+
+def _is_sparse(st: os.stat_result) -> bool:
+    """Whether a regular file has fewer blocks allocated than its size needs."""
+    return (
+        stat.S_ISREG(st.st_mode)
+        and hasattr(os, "SEEK_DATA")
+        and hasattr(st, "st_blocks")
+        and st.st_blocks * 512 < st.st_size
+    )
+
+
+def _update_from_sparse(
+    f,
+    hash_objs: Iterable,
+    drop_behind: bool = False,
+    queue_depth: int = 0
+) -> bool:
+    """
+    Feed a sparse file to the hashers, reading only its data extents.
+
+    Extents are located with lseek(SEEK_DATA / SEEK_HOLE); holes are fed
+    from SPARSE_ZERO_BLOCK without touching the file, so the digest is the
+    standard one. Extents are read with the prefetching reader when
+    queue_depth is above 1, and with drop_behind their pages are dropped
+    every DROP_BEHIND_WINDOW bytes, as for dense files. Returns False
+    without consuming the file if the file system cannot report holes; the
+    caller should then read it normally.
+    """
+    fd = f.fileno()
+    size = os.fstat(fd).st_size
+    zeros = memoryview(SPARSE_ZERO_BLOCK)
+
+    def feed_zeros(length: int):
+        while length > 0:
+            chunk = zeros[:min(length, len(zeros))]
+            for hash_obj in hash_objs:
+                hash_obj.update(chunk)
+            length -= len(chunk)
+
+    buffer = bytearray(MAX_CHUNK_SIZE)
+    offset = 0
+    with memoryview(buffer) as view:
+        while offset < size:
+            try:
+                data = os.lseek(fd, offset, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:
+                    # No data after offset: the rest of the file is a hole
+                    data = size
+                elif offset == 0:
+                    return False
+                else:
+                    raise
+            feed_zeros(min(data, size) - offset)
+            if data >= size:
+                break
+
+            hole = min(os.lseek(fd, data, os.SEEK_HOLE), size)
+            offset = hole
+            if queue_depth > 1 and _update_from_prefetch(
+                f, hash_objs, queue_depth, drop_behind=drop_behind, start=data, end=hole
+            ):
+                continue
+            f.seek(data)
+            position = dropped = data
+            while position < hole:
+                n = f.readinto(view[:min(len(buffer), hole - position)])
+                if not n:
+                    # Truncated while reading; hash what was there
+                    return True
+                chunk = view[:n]
+                for hash_obj in hash_objs:
+                    hash_obj.update(chunk)
+                chunk.release()
+                position += n
+                if drop_behind and position - dropped >= DROP_BEHIND_WINDOW:
+                    _fadvise(fd, dropped, position - dropped, "POSIX_FADV_DONTNEED")
+                    dropped = position
+            if drop_behind:
+                _fadvise(fd, dropped, hole - dropped, "POSIX_FADV_DONTNEED")
+    return True
+
+
+@dataclass(frozen=True)
+class ReadOptions:
+    """
+    How files are read for hashing. Picklable, so it reaches pool workers,
+    unless stats is set; instrumentation only works with threads.
+
+    Attributes:
+        queue_depth: Number of concurrent positional reads kept in flight
+            ahead of the hashers; 0 or 1 uses mmap / a single read buffer
+        no_cache_pollution: Read with POSIX_FADV_SEQUENTIAL and drop pages
+            from the page cache behind the read cursor, so a bulk sweep
+            does not evict other workloads' hot pages; never uses mmap
+        stats: Optional HashStats collector timing every file read
+        detect_holes: Skip reading the holes of sparse files where the file
+            system reports them; only benchmarks turn this off
+    """
+    queue_depth: int = 0
+    no_cache_pollution: bool = False
+    stats: Optional[HashStats] = None
+    detect_holes: bool = True
+
+
+DEFAULT_READ_OPTIONS = ReadOptions()
+
+
+class _Prefetcher:
+    """Read threads and a ring of read buffers, reused for every file one thread hashes."""
+
+    def __init__(self, queue_depth: int, chunk_size: int):
+        self.queue_depth = queue_depth
+        self.chunk_size = chunk_size
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=queue_depth)
+        self.buffers = [bytearray(chunk_size) for _ in range(queue_depth)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+
+
+# One prefetcher per hashing thread, so concurrent files never share buffers
+_prefetchers = threading.local()
+
+
+def _get_prefetcher(queue_depth: int, chunk_size: int) -> _Prefetcher:
+    prefetcher = getattr(_prefetchers, "current", None)
+    if (
+        prefetcher is None
+        or prefetcher.queue_depth != queue_depth
+        or prefetcher.chunk_size != chunk_size
+    ):
+        if prefetcher is not None:
+            prefetcher.executor.shutdown(wait=True)
+        prefetcher = _prefetchers.current = _Prefetcher(queue_depth, chunk_size)
+    return prefetcher
+
+
+def _update_from_prefetch(
+    f,
+    hash_objs: Iterable,
+    queue_depth: int,
+    chunk_size: int = PREFETCH_CHUNK_SIZE,
+    drop_behind: bool = False,
+    start: int = 0,
+    end: Optional[int] = None
+) -> bool:
+    """
+    Feed a file, or its byte range [start, end), to the hashers while reads
+    are issued ahead of them.
+
+    A pool of queue_depth threads issues positional reads (preadv into a
+    ring of reusable buffers, or pread) for the next chunks while the
+    calling thread hashes the current one, in file order. Fast NVMe and
+    network block storage only reach full bandwidth with several requests
+    in flight. The pool and buffers are kept per calling thread and reused
+    across files, and no more reads are issued than the range has chunks.
+    With drop_behind, hashed pages are dropped from the page cache.
+
+    Returns False without consuming anything for pipes and special files,
+    ranges of a single chunk or less, which gain nothing from prefetching,
+    or on platforms without positional reads; the caller should then fall
+    back.
+    """
+    if not hasattr(os, "pread"):
+        return False
+    fd = f.fileno()
+    st = os.fstat(fd)
+    if not stat.S_ISREG(st.st_mode):
+        return False
+    if end is None:
+        end = st.st_size
+    if end - start <= chunk_size:
+        return False
+    prefetcher = _get_prefetcher(queue_depth, chunk_size)
+    buffers, views, executor = prefetcher.buffers, prefetcher.views, prefetcher.executor
+
+    def read_into(slot: int, offset: int) -> int:
+        length = min(chunk_size, end - offset)
+        if hasattr(os, "preadv"):
+            return os.preadv(fd, [views[slot][:length]], offset)
+        data = os.pread(fd, length, offset)
+        buffers[slot][:len(data)] = data
+        return len(data)
+
+    def submit(slot: int, index: int):
+        offset = start + index * chunk_size
+        if offset < end:
+            pending.append(executor.submit(read_into, slot, offset))
+
+    pending = collections.deque()
+    for slot in range(queue_depth):
+        submit(slot, slot)
+    index = 0
+    dropped = start
+    try:
+        while pending:
+            n = pending.popleft().result()
+            slot = index % queue_depth
+            if n:
+                chunk = views[slot][:n]
+                for hash_obj in hash_objs:
+                    hash_obj.update(chunk)
+                chunk.release()
+            position = start + index * chunk_size + n
+            if drop_behind and position - dropped >= DROP_BEHIND_WINDOW:
+                _fadvise(fd, dropped, position - dropped, "POSIX_FADV_DONTNEED")
+                dropped = position
+            if n < min(chunk_size, end - (position - n)):
+                # Short read: the file was truncated
+                break
+            # The slot is free again; refill it with the chunk queue_depth ahead
+            submit(slot, index + queue_depth)
+            index += 1
+    finally:
+        # Reads still in flight must finish before the buffers are reused
+        for future in pending:
+            future.cancel()
+        concurrent.futures.wait(pending)
+    if drop_behind:
+        _fadvise(fd, dropped, end - dropped, "POSIX_FADV_DONTNEED")
+    return True
+
+
+def _update_from_file(f, hash_objs: Iterable, options: ReadOptions = DEFAULT_READ_OPTIONS):
+    """Feed an open file to the hashers with the best reader for the options."""
+    drop_behind = options.no_cache_pollution
+    hash_objs = list(hash_objs)
+    if len(hash_objs) == 1 and not drop_behind and hasattr(hash_objs[0], "update_from_fd"):
+        # Kernel-side hashers (AF_ALG) can take the file without a user-space copy
+        if hash_objs[0].update_from_fd(f.fileno()):
+            return
+    if drop_behind:
+        _fadvise(f.fileno(), 0, 0, "POSIX_FADV_SEQUENTIAL")
+    if (
+        options.detect_holes
+        and _is_sparse(os.fstat(f.fileno()))
+        and _update_from_sparse(f, hash_objs, drop_behind, options.queue_depth)
+    ):
+        return
+    if options.queue_depth > 1 and _update_from_prefetch(
+        f, hash_objs, options.queue_depth, drop_behind=drop_behind
+    ):
+        return
+    if drop_behind:
+        # A memory map would pull the whole file into the page cache
+        _update_from_reads(f, hash_objs, drop_behind=True)
+    elif not _update_from_mmap(f, hash_objs):
+        # Read file in chunks to handle large files efficiently
+        _update_from_reads(f, hash_objs)
+
+
+def _update_from_open_file(
+    file_path: Path,
+    f,
+    hash_objs: Dict[str, object],
+    extra: List,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> Dict[str, object]:
+    """
+    Feed an open file to named hashers plus extra consumers, with stats if enabled.
+
+    Returns the hashers that were fed, which are timing wrappers around the
+    originals when options.stats is set.
+    """
+    if options.stats is None:
+        _update_from_file(f, list(hash_objs.values()) + extra, options)
+        return hash_objs
+    timed = options.stats.instrument(hash_objs)
+    with options.stats.measure(file_path, f, timed) as progress:
+        _update_from_file(f, list(timed.values()) + extra + progress, options)
+    return timed
+
+
+def calculate_hash(
+    file_path: Path,
+    hash_func,
+    pieces: Optional[PieceTable] = None,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> str:
+    """
+    Calculate hash for a file using the given hash function.
+
+    If a PieceTable is given, it is fed the same chunks, recording per-piece
+    digests in the same read pass. options selects how the file is read.
+    """
+    hash_obj = hash_func()
+    hash_objs = {getattr(hash_obj, "name", "digest"): hash_obj}
+    extra = [] if pieces is None else [pieces]
+    
+    try:
+        with open(file_path, 'rb', buffering=0) as f:
+            _update_from_open_file(file_path, f, hash_objs, extra, options)
+        if pieces is not None:
+            pieces.finish()
+        return hash_obj.hexdigest()
+    except IOError as e:
+        raise IOError(f"Error reading file: {e}")
+
+
+def calculate_hashes(
+    file_path: Path,
+    hash_funcs: Dict[str, Callable],
+    threaded: bool = False,
+    pieces: Optional[PieceTable] = None,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> Dict[str, str]:
+    """
+    Calculate several hashes for a file in a single read pass.
+
+    Args:
+        file_path: Path to the file to hash
+        hash_funcs: Mapping of algorithm name to hash constructor
+        threaded: Run each algorithm in its own worker thread
+        pieces: Optional PieceTable to record per-piece digests into
+        options: How the file is read (ignored by the threaded fan-out)
+
+    Returns:
+        Mapping of algorithm name to hex digest, in the order given
+    """
+    extra = [] if pieces is None else [pieces]
+    if threaded and len(hash_funcs) + len(extra) > 1:
+        digests = _calculate_hashes_threaded(file_path, hash_funcs, extra_objs=extra)
+        if pieces is not None:
+            pieces.finish()
+        return digests
+
+    hash_objs = {name: hash_func() for name, hash_func in hash_funcs.items()}
+
+    try:
+        with open(file_path, 'rb', buffering=0) as f:
+            # Feed every chunk to all hashers so the file is only read once
+            hash_objs = _update_from_open_file(file_path, f, hash_objs, extra, options)
+    except IOError as e:
+        raise IOError(f"Error reading file: {e}")
+    if pieces is not None:
+        pieces.finish()
+
+    return {name: hash_obj.hexdigest() for name, hash_obj in hash_objs.items()}
+
+
+def _calculate_hashes_threaded(
+    file_path: Path,
+    hash_funcs: Dict[str, Callable],
+    chunk_size: int = THREADED_CHUNK_SIZE,
+    queue_depth: int = 4,
+    extra_objs: Iterable = ()
+) -> Dict[str, str]:
+    """
+    Calculate several hashes with one reader and one worker thread per algorithm.
+
+    The calling thread reads the file and hands every chunk to each worker's
+    queue. Chunks are immutable bytes, so all workers share the same buffer.
+    Total time approaches that of the slowest algorithm rather than the sum.
+    Objects in extra_objs (e.g. a PieceTable) get a worker of their own.
+    """
+    hash_objs = {name: hash_func() for name, hash_func in hash_funcs.items()}
+    consumers = list(hash_objs.values()) + list(extra_objs)
+    queues = [queue.Queue(maxsize=queue_depth) for _ in consumers]
+
+    def worker(hash_obj, chunks: queue.Queue):
+        # None is the end-of-file sentinel
+        for chunk in iter(chunks.get, None):
+            hash_obj.update(chunk)
+
+    threads = [
+        threading.Thread(target=worker, args=(consumer, chunks), daemon=True)
+        for consumer, chunks in zip(consumers, queues)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                for chunks in queues:
+                    chunks.put(chunk)
+    except IOError as e:
+        raise IOError(f"Error reading file: {e}")
+    finally:
+        # Always release the workers, even if reading failed
+        for chunks in queues:
+            chunks.put(None)
+        for thread in threads:
+            thread.join()
+
+    return {name: hash_obj.hexdigest() for name, hash_obj in hash_objs.items()}
+
+
+def _hash_batch(
+    paths: List[Path],
+    hash_funcs: Dict[str, Callable],
+    piece_size: Optional[int] = None,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> List[Tuple[Path, Optional[Dict[str, str]], Optional[str]]]:
+    """
+    Hash a batch of files, capturing errors instead of raising them.
+
+    With piece_size set, a piece-table sidecar is written next to each file.
+    """
+    results = []
+    for path in paths:
+        try:
+            if piece_size:
+                pieces = PieceTable(piece_size)
+                digests = calculate_hashes(path, hash_funcs, pieces=pieces, options=options)
+                pieces.mtime_ns = os.stat(path).st_mtime_ns
+                pieces.save(sidecar_path(path))
+            else:
+                digests = calculate_hashes(path, hash_funcs, options=options)
+            results.append((path, digests, None))
+        except IOError as e:
+            results.append((path, None, str(e)))
+    return results
+
+
+def _plan_batches(
+    paths: Iterable[Path],
+    hash_funcs: Dict[str, Callable],
+    batch_size: int,
+    cache=None,
+    stats: Optional[Dict[Path, os.stat_result]] = None
+) -> Iterator[Tuple[str, object]]:
+    """
+    Group paths into work batches, answering cached files directly.
+
+    Yields ("hit", result) for files whose digests are all in the cache and
+    ("batch", paths) for lists of at most batch_size files to hash. The
+    stat taken for the cache lookup is recorded in stats for the later store.
+    """
+    batch = []
+    for path in paths:
+        if cache is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Let the hashing step report the error
+                st = None
+            if st is not None and stat.S_ISREG(st.st_mode):
+                digests = cache.get(st, hash_funcs.keys())
+                if digests is not None:
+                    yield "hit", (path, digests, None)
+                    continue
+                stats[path] = st
+        batch.append(path)
+        if len(batch) >= batch_size:
+            yield "batch", batch
+            batch = []
+    if batch:
+        yield "batch", batch
+
+
+def iter_hashes(
+    paths: Iterable[Path],
+    hash_funcs: Dict[str, Callable],
+    workers: int = 1,
+    use_processes: bool = False,
+    cache=None,
+    piece_size: Optional[int] = None,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> Iterator[Tuple[Path, Optional[Dict[str, str]], Optional[str]]]:
+    """
+    Hash many files, optionally on a pool of workers.
+
+    Threads suit I/O-bound storage since hashlib releases the GIL on large
+    updates; processes suit many small files where hashing is CPU-bound.
+    Paths are consumed lazily and only a bounded number of tasks is kept in
+    flight, so huge trees never sit in memory.
+
+    Args:
+        paths: Files to hash
+        hash_funcs: Mapping of algorithm name to hash constructor
+        workers: Number of workers (0 = one per CPU, 1 = no pool)
+        use_processes: Use a process pool instead of a thread pool
+        cache: Optional HashCache; unchanged files are answered from it
+            and fresh digests are stored in it
+        piece_size: Also write a piece-table sidecar with pieces of this size
+        options: How each file is read
+
+    Yields:
+        (path, digests, error) tuples as files finish; exactly one of
+        digests and error is None. Results arrive out of order with a pool.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    stats = {}
+
+    def finish(results):
+        for path, digests, error in results:
+            st = stats.pop(path, None)
+            if cache is not None and st is not None and error is None:
+                cache.put(path, st, digests)
+            yield path, digests, error
+
+    if workers == 1:
+        for kind, item in _plan_batches(paths, hash_funcs, 1, cache, stats):
+            if kind == "hit":
+                yield item
+            else:
+                yield from finish(_hash_batch(item, hash_funcs, piece_size, options))
+        return
+
+    if use_processes:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        batch_size = PROCESS_BATCH_SIZE
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        batch_size = 1
+
+    max_in_flight = workers * 4
+    with executor:
+        plan = _plan_batches(paths, hash_funcs, batch_size, cache, stats)
+        pending = set()
+        try:
+            while True:
+                # Top up the queue, then wait for at least one task
+                for kind, item in plan:
+                    if kind == "hit":
+                        yield item
+                        continue
+                    pending.add(
+                        executor.submit(_hash_batch, item, hash_funcs, piece_size, options)
+                    )
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    yield from finish(future.result())
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def resolve_algorithms(names: Iterable[str]) -> Dict[str, Callable]:
+    """
+    Map algorithm names or menu numbers to hash constructors.
+
+    Args:
+        names: Algorithm names (case-insensitive), menu numbers, or "all";
+            comma-separated values are split
+
+    Returns:
+        Mapping of canonical algorithm name to hash constructor, in the order given
+
+    Raises:
+        ValueError: If a name does not match any entry in HASH_ALGORITHMS
+    """
+    by_name = {name.lower(): (name, func) for name, func in HASH_ALGORITHMS.values()}
+    hash_funcs = {}
+    for value in names:
+        for token in value.split(","):
+            token = token.strip().lower()
+            if not token:
+                continue
+            if token == "all":
+                for name, func in HASH_ALGORITHMS.values():
+                    hash_funcs[name] = func
+            elif token in HASH_ALGORITHMS:
+                name, func = HASH_ALGORITHMS[token]
+                hash_funcs[name] = func
+            elif token in by_name:
+                name, func = by_name[token]
+                hash_funcs[name] = func
+            else:
+                raise ValueError(f"Unknown hash algorithm: {token}")
+    return hash_funcs
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Long-lived hashing daemon and its thin client, over a Unix domain socket.
+
+Starting Python and importing the hashing code costs more than hashing a
+small file, so build pipelines that hash thousands of artifacts one command
+at a time spend most of their time in startup. The daemon (started with
+`main.py --serve SOCKET`) stays resident, keeps recent digests in an
+in-memory LRU cache and answers batched requests; this module run as a
+script is the client, and only imports what it needs to talk to the socket.
+
+Protocol: the client sends one JSON request per line,
+
+    {"paths": ["/abs/path", ...], "algorithms": ["sha256"], "recursive": false}
+
+and the daemon answers with one JSON object per line (NDJSON), one per file
+in order, followed by a summary line:
+
+    {"path": "/abs/path", "digests": {"SHA256": "9f86d0..."}}
+    {"path": "/abs/missing", "error": "Error reading file: ..."}
+    {"done": true, "files": 2, "errors": 1, "hits": 0, "misses": 1}
+
+A request that cannot be served at all is answered with a single
+{"done": true, "error": "..."} line. A connection may carry any number of
+requests.
+"""
+
+import argparse
+import collections
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+# Digests kept by the daemon's LRU cache, one entry per file and algorithm
+DEFAULT_LRU_ENTRIES = 100_000
+
+
+class DigestLRU:
+    """
+    Thread-safe LRU cache of hex digests.
+
+    Keyed like HashCache by (device, inode, size, mtime_ns, algorithm), so a
+    file that changed since it was hashed simply misses.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_LRU_ENTRIES):
+        if max_entries <= 0:
+            raise ValueError("LRU cache size must be positive")
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(st: os.stat_result, algorithm: str) -> tuple:
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, algorithm)
+
+    def get(self, st: os.stat_result, algorithm: str) -> Optional[str]:
+        key = self._key(st, algorithm)
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return digest
+
+    def put(self, st: os.stat_result, algorithm: str, digest: str):
+        key = self._key(st, algorithm)
+        with self._lock:
+            self._entries[key] = digest
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class HashService:
+    """
+    Answers hash requests, using the LRU cache before reading files.
+
+    Args:
+        hash_file: Callable(path, hash_funcs) returning {name: hex digest}
+        resolve: Callable(algorithm names) returning {name: hash constructor};
+            raises ValueError for unknown names
+        expand: Callable(paths, recursive) yielding the files to hash
+        cache: Digest cache shared by all connections
+    """
+
+    def __init__(
+        self,
+        hash_file: Callable,
+        resolve: Callable,
+        expand: Callable,
+        cache: DigestLRU
+    ):
+        self.hash_file = hash_file
+        self.resolve = resolve
+        self.expand = expand
+        self.cache = cache
+
+    def _digests(self, path: Path, hash_funcs: Dict[str, Callable]) -> Dict[str, str]:
+        """Digests of one file; only algorithms missing from the cache are computed."""
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            raise IOError(f"Error reading file: {e}")
+        cached = {name: self.cache.get(st, name) for name in hash_funcs}
+        missing = {name: func for name, func in hash_funcs.items() if cached[name] is None}
+        if missing:
+            fresh = self.hash_file(path, missing)
+            for name, digest in fresh.items():
+                self.cache.put(st, name, digest)
+            cached.update(fresh)
+        return cached
+
+    def handle(self, request: Dict) -> Iterator[Dict]:
+        """Yield the response lines for one decoded request."""
+        paths = request.get("paths")
+        if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+            yield {"done": True, "error": "Request needs a list of paths"}
+            return
+        try:
+            hash_funcs = self.resolve(request.get("algorithms") or ["sha256"])
+        except ValueError as e:
+            yield {"done": True, "error": str(e)}
+            return
+
+        hits, misses = self.cache.hits, self.cache.misses
+        files = errors = 0
+        for path in self.expand(paths, bool(request.get("recursive"))):
+            files += 1
+            try:
+                digests = self._digests(path, hash_funcs)
+            except IOError as e:
+                errors += 1
+                yield {"path": str(path), "error": str(e)}
+                continue
+            yield {"path": str(path), "digests": digests}
+        # Counters are shared across connections, so these are approximate
+        # when several clients are served at once
+        yield {
+            "done": True,
+            "files": files,
+            "errors": errors,
+            "hits": self.cache.hits - hits,
+            "misses": self.cache.misses - misses,
+        }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                responses = [{"done": True, "error": f"Malformed request: {e}"}]
+            else:
+                if isinstance(request, dict):
+                    responses = self.server.service.handle(request)
+                else:
+                    responses = [{"done": True, "error": "Request must be a JSON object"}]
+            try:
+                for response in responses:
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+
+class HashDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server handing each connection to a thread."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, service: HashService):
+        self.service = service
+        self.socket_path = Path(socket_path)
+        _remove_stale_socket(self.socket_path)
+        super().__init__(str(self.socket_path), _RequestHandler)
+        # The daemon reads files on behalf of its clients; keep it private
+        os.chmod(self.socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(socket_path: Path):
+    """
+    Remove a socket file left behind by a daemon that is no longer running.
+
+    Raises:
+        OSError: If another daemon is still listening on the path
+    """
+    if not socket_path.exists():
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(socket_path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)
+    else:
+        raise OSError(f"A daemon is already listening on {socket_path}")
+    finally:
+        probe.close()
+
+
+def request_hashes(
+    socket_path: Path,
+    paths: Iterable[str],
+    algorithms: Optional[List[str]] = None,
+    recursive: bool = False
+) -> Iterator[Dict]:
+    """
+    Send one request to a running daemon and yield its response lines.
+
+    Relative paths are made absolute here, since the daemon does not share
+    the caller's working directory. The last line yielded has "done" set.
+    """
+    request = {
+        "paths": [os.path.abspath(p) for p in paths],
+        "algorithms": algorithms or ["sha256"],
+        "recursive": recursive,
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as responses:
+            for line in responses:
+                response = json.loads(line)
+                yield response
+                if response.get("done"):
+                    return
+    raise IOError("Daemon closed the connection before finishing the request")
+
+
+def _format_line(path: str, digests: Dict[str, str]) -> str:
+    """sha256sum-style output line, escaped like main.format_result."""
+    prefix = ""
+    if "\\" in path or "\n" in path:
+        path = path.replace("\\", "\\\\").replace("\n", "\\n")
+        prefix = "\\"
+    return prefix + " ".join(digests.values()) + "  " + path
+
+
+def main():
+    """Thin client: hash files through a running daemon."""
+    parser = argparse.ArgumentParser(
+        description="Hash files through a daemon started with 'main.py --serve SOCKET'."
+    )
+    parser.add_argument("socket", help="Path of the daemon's Unix socket")
+    parser.add_argument("paths", nargs="+", help="Files, directories or glob patterns")
+    parser.add_argument(
+        "-a", "--algorithm",
+        action="append",
+        metavar="NAME",
+        help="Hash algorithm, as accepted by main.py -a (default: SHA256)"
+    )
+    parser.add_argument(
+        "-r", "--recursive",
+        action="store_true",
+        help="Hash all files below directories"
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the daemon's NDJSON responses as-is"
+    )
+    args = parser.parse_args()
+
+    failed = False
+    try:
+        for response in request_hashes(args.socket, args.paths, args.algorithm, args.recursive):
+            if args.json:
+                print(json.dumps(response))
+            if response.get("done"):
+                if "error" in response:
+                    if not args.json:
+                        print(f"Error: {response['error']}", file=sys.stderr)
+                    failed = True
+            elif "error" in response:
+                if not args.json:
+                    print(f"{response['path']}: {response['error']}", file=sys.stderr)
+                failed = True
+            elif not args.json:
+                print(_format_line(response["path"], response["digests"]))
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
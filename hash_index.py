@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Compact on-disk index of known digests, for allow/deny list lookups.
+
+Python sets of hex strings need well over 100 bytes per digest, so a
+reference set of tens of millions of digests does not fit in memory
+comfortably. This index stores the raw digests sorted in a file that is
+memory-mapped and binary-searched, with a Bloom filter in front so most
+lookups of unknown digests never touch the sorted table.
+
+File format, version 1:
+
+- Header (HEADER struct, little-endian): magic b"FHIDX001", algorithm name
+  (lower case, NUL-padded to 16 bytes), digest size, number of Bloom hash
+  functions, entry count, offset of the digest table, offset of the Bloom
+  filter, and the Bloom filter size in bits (a power of two).
+- Fan-out table: FANOUT_SIZE + 1 uint64 values; entry p is the number of
+  digests whose first two bytes, read big-endian, are less than p. A lookup
+  only searches the digests sharing its prefix.
+- Digest table: count raw digests, sorted and unique.
+- Bloom filter: bit i is bit (i % 8) of byte (i // 8). Bit positions for a
+  digest come from double hashing of its last 16 bytes, h1 = low 64 bits
+  and h2 = high 64 bits | 1, little-endian: (h1 + i * h2) mod bits, for i
+  in range(number of hash functions).
+
+Run as a script to build, merge, query and describe index files.
+"""
+
+import argparse
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+INDEX_MAGIC = b"FHIDX001"
+HEADER = struct.Struct("<8s16sIIQQQQ")
+
+# Digests are bucketed by their first two bytes
+FANOUT_SIZE = 1 << 16
+FANOUT = struct.Struct(f"<{FANOUT_SIZE + 1}Q")
+
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+
+# Digests sorted in memory per run when building; about 150 MB for SHA256
+SORT_RUN_ENTRIES = 2_000_000
+
+# Digests buffered per write to the index or a run file
+WRITE_BATCH_ENTRIES = 65_536
+
+MIN_DIGEST_SIZE = 16
+
+
+def bloom_parameters(entries: int, false_positive_rate: float) -> Tuple[int, int]:
+    """
+    Size a Bloom filter for a number of entries.
+
+    Returns:
+        (size in bits, a power of two; number of hash functions)
+    """
+    if not 0 < false_positive_rate < 1:
+        raise ValueError("False positive rate must be between 0 and 1")
+    entries = max(entries, 1)
+    wanted = -entries * math.log(false_positive_rate) / math.log(2) ** 2
+    bits = 1 << max(6, math.ceil(math.log2(wanted)))
+    hashes = max(1, round(bits / entries * math.log(2)))
+    return bits, min(hashes, 16)
+
+
+def _bloom_positions(digest: bytes, bits: int, hashes: int) -> Iterator[int]:
+    value = int.from_bytes(digest[-16:], "little")
+    h1 = value & 0xFFFFFFFFFFFFFFFF
+    h2 = (value >> 64) | 1
+    mask = bits - 1
+    for i in range(hashes):
+        yield (h1 + i * h2) & mask
+
+
+def parse_digest_lines(
+    lines: Iterable[str],
+    digest_size: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Yield raw digests from hex text, one per line.
+
+    Only the first field of each line is used, so sha256sum-style manifests
+    work as input. Blank lines and lines starting with "#" are skipped.
+
+    Raises:
+        ValueError: If a line is not a hex digest, or digests differ in size
+    """
+    for number, line in enumerate(lines, 1):
+        fields = line.split(None, 1)
+        if not fields or fields[0].startswith("#"):
+            continue
+        token = fields[0].lstrip("\\")
+        try:
+            digest = bytes.fromhex(token)
+        except ValueError:
+            raise ValueError(f"Line {number}: not a hex digest: {token[:80]!r}")
+        if len(digest) < MIN_DIGEST_SIZE:
+            raise ValueError(
+                f"Line {number}: digests must be at least {MIN_DIGEST_SIZE} bytes"
+            )
+        if digest_size is None:
+            digest_size = len(digest)
+        if len(digest) != digest_size:
+            raise ValueError(f"Line {number}: expected a {digest_size}-byte digest")
+        yield digest
+
+
+def _write_records(f, records: Iterable[bytes]):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= WRITE_BATCH_ENTRIES:
+            f.write(b"".join(batch))
+            batch.clear()
+    f.write(b"".join(batch))
+
+
+def _read_records(path: Path, digest_size: int) -> Iterator[bytes]:
+    block_size = digest_size * WRITE_BATCH_ENTRIES
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            for offset in range(0, len(block), digest_size):
+                yield block[offset:offset + digest_size]
+
+
+def _unique(digests: Iterable[bytes]) -> Iterator[bytes]:
+    """Drop adjacent duplicates from a sorted stream."""
+    previous = None
+    for digest in digests:
+        if digest != previous:
+            yield digest
+            previous = digest
+
+
+def _write_index(
+    out_path: Path,
+    sorted_digests: Iterable[bytes],
+    max_entries: int,
+    algorithm: str,
+    digest_size: int,
+    false_positive_rate: float
+) -> int:
+    """
+    Write an index from sorted, unique digests, replacing out_path atomically.
+
+    The Bloom filter is sized for max_entries, an upper bound on the count.
+
+    Returns:
+        Number of entries written
+    """
+    bits, hashes = bloom_parameters(max_entries, false_positive_rate)
+    bloom = bytearray(bits // 8)
+    prefix_counts = [0] * FANOUT_SIZE
+    digests_offset = HEADER.size + FANOUT.size
+    count = 0
+
+    def account(digests: Iterable[bytes]) -> Iterator[bytes]:
+        nonlocal count
+        mask = bits - 1
+        for digest in digests:
+            count += 1
+            prefix_counts[(digest[0] << 8) | digest[1]] += 1
+            # Inlined _bloom_positions; this loop dominates build time
+            value = int.from_bytes(digest[-16:], "little")
+            h1 = value & 0xFFFFFFFFFFFFFFFF
+            h2 = (value >> 64) | 1
+            for i in range(hashes):
+                position = (h1 + i * h2) & mask
+                bloom[position >> 3] |= 1 << (position & 7)
+            yield digest
+
+    tmp = Path(str(out_path) + ".tmp")
+    with open(tmp, "wb") as f:
+        f.seek(digests_offset)
+        _write_records(f, account(sorted_digests))
+        bloom_offset = f.tell()
+        f.write(bloom)
+
+        fanout = [0] * (FANOUT_SIZE + 1)
+        for prefix, n in enumerate(prefix_counts):
+            fanout[prefix + 1] = fanout[prefix] + n
+        f.seek(0)
+        f.write(HEADER.pack(
+            INDEX_MAGIC, algorithm.lower().encode("ascii"), digest_size, hashes,
+            count, digests_offset, bloom_offset, bits
+        ))
+        f.write(FANOUT.pack(*fanout))
+    os.replace(tmp, out_path)
+    return count
+
+
+def build_index(
+    out_path: Path,
+    digests: Iterable[bytes],
+    algorithm: str,
+    false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE
+) -> int:
+    """
+    Build an index from raw digests in any order, with duplicates allowed.
+
+    Digests are sorted in runs of SORT_RUN_ENTRIES spilled to temporary
+    files next to out_path, then merged, so memory use stays bounded.
+
+    Returns:
+        Number of unique entries in the index
+    """
+    out_path = Path(out_path)
+    digest_size = None
+    total = 0
+    with tempfile.TemporaryDirectory(dir=out_path.parent) as tmp_dir:
+        runs: List[Path] = []
+        run: List[bytes] = []
+
+        def spill():
+            run.sort()
+            path = Path(tmp_dir) / f"run{len(runs)}"
+            with open(path, "wb") as f:
+                _write_records(f, _unique(run))
+            runs.append(path)
+            run.clear()
+
+        for digest in digests:
+            if digest_size is None:
+                digest_size = len(digest)
+            elif len(digest) != digest_size:
+                raise ValueError("All digests in an index must have the same size")
+            run.append(digest)
+            total += 1
+            if len(run) >= SORT_RUN_ENTRIES:
+                spill()
+
+        if digest_size is None:
+            raise ValueError("No digests to index")
+        if len(runs) == 0:
+            run.sort()
+            merged = _unique(run)
+        else:
+            if run:
+                spill()
+            merged = _unique(heapq.merge(*(_read_records(p, digest_size) for p in runs)))
+        return _write_index(
+            out_path, merged, total, algorithm, digest_size, false_positive_rate
+        )
+
+
+class KnownHashIndex:
+    """
+    Read-only, memory-mapped index of known digests.
+
+    Supports `digest in index` for raw digests and contains_hex() for hex.
+    Use as a context manager, or call close().
+
+    Raises:
+        ValueError: If the file is not an index of a supported version
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"Not a hash index: {self.path}")
+        try:
+            if len(self._map) < HEADER.size + FANOUT.size:
+                raise ValueError(f"Not a hash index: {self.path}")
+            (
+                magic, algorithm, self.digest_size, self.bloom_hashes, self.count,
+                self._digests_offset, self._bloom_offset, self.bloom_bits
+            ) = HEADER.unpack_from(self._map)
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"Not a hash index: {self.path}")
+            if len(self._map) < self._bloom_offset + self.bloom_bits // 8:
+                raise ValueError(f"Truncated hash index: {self.path}")
+        except ValueError:
+            self._map.close()
+            raise
+        self.algorithm = algorithm.rstrip(b"\0").decode("ascii")
+        self._fanout = FANOUT.unpack_from(self._map, HEADER.size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def might_contain(self, digest: bytes) -> bool:
+        """Bloom filter check: False means definitely absent."""
+        bloom, base = self._map, self._bloom_offset
+        for position in _bloom_positions(digest, self.bloom_bits, self.bloom_hashes):
+            if not bloom[base + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, digest: bytes) -> bool:
+        if len(digest) != self.digest_size or not self.might_contain(digest):
+            return False
+        prefix = (digest[0] << 8) | digest[1]
+        lo, hi = self._fanout[prefix], self._fanout[prefix + 1]
+        size, base, data = self.digest_size, self._digests_offset, self._map
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = base + mid * size
+            probe = data[offset:offset + size]
+            if probe < digest:
+                lo = mid + 1
+            elif probe > digest:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def contains_hex(self, hex_digest: str) -> bool:
+        try:
+            return bytes.fromhex(hex_digest) in self
+        except ValueError:
+            return False
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Yield the digests in sorted order."""
+        size, base = self.digest_size, self._digests_offset
+        for i in range(self.count):
+            offset = base + i * size
+            yield self._map[offset:offset + size]
+
+
+def merge_indexes(
+    out_path: Path,
+    index_paths: Iterable[Path],
+    false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE
+) -> int:
+    """
+    Merge indexes of the same algorithm into one, dropping duplicates.
+
+    Returns:
+        Number of unique entries in the merged index
+
+    Raises:
+        ValueError: If the indexes use different algorithms
+    """
+    indexes = [KnownHashIndex(path) for path in index_paths]
+    try:
+        if not indexes:
+            raise ValueError("No indexes to merge")
+        first = indexes[0]
+        for index in indexes[1:]:
+            if (index.algorithm, index.digest_size) != (first.algorithm, first.digest_size):
+                raise ValueError(
+                    f"Cannot merge {index.algorithm} index {index.path} "
+                    f"into {first.algorithm} index"
+                )
+        return _write_index(
+            Path(out_path),
+            _unique(heapq.merge(*indexes)),
+            sum(len(index) for index in indexes),
+            first.algorithm,
+            first.digest_size,
+            false_positive_rate
+        )
+    finally:
+        for index in indexes:
+            index.close()
+
+
+def _iter_input_digests(paths: List[str]) -> Iterator[bytes]:
+    digest_size = None
+    for path in paths:
+        if path == "-":
+            lines = sys.stdin
+        else:
+            lines = open(path, encoding="utf-8", errors="replace")
+        try:
+            for digest in parse_digest_lines(lines, digest_size):
+                digest_size = len(digest)
+                yield digest
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+
+
+def main():
+    """Build, merge, query and describe known-hash indexes."""
+    parser = argparse.ArgumentParser(description="Manage known-hash index files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser(
+        "build",
+        help="Build an index from hex digests, one per line (manifests work too)"
+    )
+    build.add_argument("index", help="Index file to write")
+    build.add_argument("inputs", nargs="+", help="Text files of digests; '-' reads stdin")
+    build.add_argument(
+        "-a", "--algorithm",
+        default="sha256",
+        help="Algorithm the digests were made with (default: sha256)"
+    )
+    build.add_argument(
+        "--fp-rate",
+        type=float,
+        default=DEFAULT_FALSE_POSITIVE_RATE,
+        help=f"Bloom filter false positive rate (default: {DEFAULT_FALSE_POSITIVE_RATE})"
+    )
+
+    merge = commands.add_parser("merge", help="Merge indexes into one")
+    merge.add_argument("index", help="Index file to write")
+    merge.add_argument("inputs", nargs="+", help="Indexes to merge")
+    merge.add_argument(
+        "--fp-rate",
+        type=float,
+        default=DEFAULT_FALSE_POSITIVE_RATE,
+        help=f"Bloom filter false positive rate (default: {DEFAULT_FALSE_POSITIVE_RATE})"
+    )
+
+    query = commands.add_parser(
+        "query",
+        help="Print the given digests (or stdin lines) found in the index"
+    )
+    query.add_argument("index", help="Index file to search")
+    query.add_argument("digests", nargs="*", help="Hex digests (default: read stdin)")
+    query.add_argument(
+        "-v", "--invert",
+        action="store_true",
+        help="Print the digests that are NOT in the index"
+    )
+
+    info = commands.add_parser("info", help="Describe an index")
+    info.add_argument("index", help="Index file")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "build":
+            count = build_index(
+                Path(args.index), _iter_input_digests(args.inputs), args.algorithm, args.fp_rate
+            )
+            print(f"Indexed {count} unique digests in {args.index}", file=sys.stderr)
+        elif args.command == "merge":
+            count = merge_indexes(Path(args.index), [Path(p) for p in args.inputs], args.fp_rate)
+            print(f"Merged {count} unique digests into {args.index}", file=sys.stderr)
+        elif args.command == "query":
+            found = False
+            with KnownHashIndex(Path(args.index)) as index:
+                lines = args.digests or (line.strip() for line in sys.stdin)
+                for line in lines:
+                    digest = line.split(None, 1)[0] if line.strip() else ""
+                    if digest and index.contains_hex(digest) != args.invert:
+                        print(line)
+                        found = True
+            if not found:
+                sys.exit(1)
+        else:
+            with KnownHashIndex(Path(args.index)) as index:
+                print(f"Algorithm:     {index.algorithm}")
+                print(f"Entries:       {index.count}")
+                print(f"Digest size:   {index.digest_size} bytes")
+                print(f"Bloom filter:  {index.bloom_bits // 8} bytes, {index.bloom_hashes} hashes")
+                print(f"File size:     {os.path.getsize(index.path)} bytes")
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
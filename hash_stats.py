@@ -0,0 +1,202 @@
+"""
+Opt-in instrumentation for the hashing loop.
+
+A HashStats collector is passed to the readers through ReadOptions.stats.
+Each hasher is wrapped so the time spent in update() is measured per
+algorithm; the rest of the time a file takes is time the hasher spent
+waiting for data. When the wait dominates, the storage is the bottleneck;
+when update time dominates, the CPU is. Large files can also get a tqdm
+progress bar.
+
+With the default mmap reader, page faults happen inside update(), so cold
+reads show up as update time; use --queue-depth or --no-cache-pollution for
+a clean split between reading and hashing. Wrapped hashers hide
+update_from_fd(), so with --kernel-crypto the AF_ALG backend is fed
+through regular reads while instrumented.
+"""
+
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+
+# Latencies kept for percentile estimates; beyond this a uniform sample is kept
+LATENCY_SAMPLE_SIZE = 10_000
+
+# Files at least this large get a progress bar when progress is enabled
+DEFAULT_PROGRESS_THRESHOLD = 1024 * 1024 * 1024
+
+MIB = 1024 * 1024
+
+
+class TimedHash:
+    """A hashlib-style object that measures the time spent in update()."""
+
+    def __init__(self, hash_obj):
+        self.hash_obj = hash_obj
+        self.seconds = 0.0
+        self.bytes = 0
+
+    def update(self, data):
+        start = time.perf_counter()
+        self.hash_obj.update(data)
+        self.seconds += time.perf_counter() - start
+        self.bytes += len(data)
+
+    def digest(self) -> bytes:
+        return self.hash_obj.digest()
+
+    def hexdigest(self) -> str:
+        return self.hash_obj.hexdigest()
+
+
+class _ProgressBar:
+    """Consumer advancing a tqdm bar by the size of each chunk."""
+
+    def __init__(self, bar):
+        self.bar = bar
+
+    def update(self, data):
+        self.bar.update(len(data))
+
+
+class HashStats:
+    """
+    Thread-safe collector of hashing throughput and latency.
+
+    Args:
+        progress: Show a progress bar for large files (needs tqdm)
+        progress_threshold: Smallest file size in bytes that gets a bar
+    """
+
+    def __init__(
+        self,
+        progress: bool = False,
+        progress_threshold: int = DEFAULT_PROGRESS_THRESHOLD
+    ):
+        self.progress = progress
+        self.progress_threshold = progress_threshold
+        self.started = time.perf_counter()
+        self.files = 0
+        self.bytes = 0
+        self.file_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.update_seconds: Dict[str, float] = {}
+        self.update_bytes: Dict[str, int] = {}
+        self.latency_max = 0.0
+        self._latencies: List[float] = []
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+        self._tqdm = None
+
+    def instrument(self, hash_objs: Dict[str, object]) -> Dict[str, TimedHash]:
+        """Wrap named hash objects so their update time is measured."""
+        return {name: TimedHash(hash_obj) for name, hash_obj in hash_objs.items()}
+
+    def _progress_bar(self, file_path: Path, size: int):
+        if not self.progress or size < self.progress_threshold:
+            return None
+        if self._tqdm is None:
+            try:
+                from tqdm import tqdm
+            except ImportError:
+                print("Progress bars need tqdm (pip install tqdm)", file=sys.stderr)
+                self.progress = False
+                return None
+            self._tqdm = tqdm
+        return self._tqdm(
+            total=size,
+            desc=Path(file_path).name,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+            leave=False,
+            file=sys.stderr
+        )
+
+    @contextlib.contextmanager
+    def measure(self, file_path: Path, f, timed: Dict[str, TimedHash]) -> Iterator[list]:
+        """
+        Time the hashing of one open file.
+
+        Yields a list of extra consumers (a progress bar, if any) to feed
+        alongside the hashers. The file is recorded only if hashing succeeds.
+        """
+        bar = self._progress_bar(file_path, os.fstat(f.fileno()).st_size)
+        start = time.perf_counter()
+        try:
+            yield [] if bar is None else [_ProgressBar(bar)]
+        finally:
+            if bar is not None:
+                bar.close()
+        self.record(time.perf_counter() - start, timed)
+
+    def record(self, seconds: float, timed: Dict[str, TimedHash]):
+        """Add one hashed file, given its wall time and its timed hashers."""
+        size = max((t.bytes for t in timed.values()), default=0)
+        busy = sum(t.seconds for t in timed.values())
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+            self.file_seconds += seconds
+            # Updates run one after another on the reading thread, so the
+            # remainder is time spent reading or waiting for prefetched data
+            self.wait_seconds += max(0.0, seconds - busy)
+            for name, t in timed.items():
+                self.update_seconds[name] = self.update_seconds.get(name, 0.0) + t.seconds
+                self.update_bytes[name] = self.update_bytes.get(name, 0) + t.bytes
+            self.latency_max = max(self.latency_max, seconds)
+            if len(self._latencies) < LATENCY_SAMPLE_SIZE:
+                self._latencies.append(seconds)
+            else:
+                slot = self._random.randrange(self.files)
+                if slot < LATENCY_SAMPLE_SIZE:
+                    self._latencies[slot] = seconds
+
+    def summary(self) -> Dict:
+        """Machine-readable summary of everything recorded so far."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            update_total = sum(self.update_seconds.values())
+
+            def percentile(p: float) -> float:
+                if not latencies:
+                    return 0.0
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+            return {
+                "files": self.files,
+                "bytes": self.bytes,
+                "elapsed_seconds": round(time.perf_counter() - self.started, 6),
+                "hashing_seconds": round(self.file_seconds, 6),
+                "read_wait_seconds": round(self.wait_seconds, 6),
+                "update_seconds": round(update_total, 6),
+                "throughput_mib_s": round(
+                    self.bytes / MIB / self.file_seconds if self.file_seconds else 0.0, 1
+                ),
+                "algorithms": {
+                    name: {
+                        "update_seconds": round(seconds, 6),
+                        "mib_s": round(
+                            self.update_bytes[name] / MIB / seconds if seconds else 0.0, 1
+                        ),
+                    }
+                    for name, seconds in self.update_seconds.items()
+                },
+                "file_latency_ms": {
+                    "mean": round(1000 * self.file_seconds / self.files, 3) if self.files else 0.0,
+                    "p50": round(1000 * percentile(0.50), 3),
+                    "p95": round(1000 * percentile(0.95), 3),
+                    "p99": round(1000 * percentile(0.99), 3),
+                    "max": round(1000 * self.latency_max, 3),
+                },
+                "bottleneck": (
+                    None if not self.files
+                    else "io" if self.wait_seconds > update_total else "cpu"
+                ),
+            }
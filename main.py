@@ -1,22 +1,65 @@
 #!/usr/bin/env python3
 """
 File Hash Generator CLI Tool
-Creates hashes for files using the top 5 hash algorithms.
+Creates hashes for files using the top 5 hash algorithms, plus BLAKE2 and SHA3.
 """
 
-import hashlib
+import argparse
+import atexit
+import concurrent.futures
+import glob
+import json
+import os
+import signal
+import stat
+import sys
+import time
+from dataclasses import replace
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from afalg import AfAlgConstructor, kernel_constructors
+from chunking import DEFAULT_AVG_CHUNK_SIZE, Chunker, analyze_dedup
+from fingerprint import (
+    DEFAULT_SAMPLE_SIZE,
+    DEFAULT_SAMPLES,
+    fingerprint_file,
+    format_fingerprint,
+    parse_fingerprint,
+)
+from hash_cache import HashCache
+from hash_core import (
+    ALL_CHOICE,
+    DEFAULT_READ_OPTIONS,
+    HASH_ALGORITHMS,
+    INSECURE_ALGORITHMS,
+    ReadOptions,
+    _update_from_reads,
+    calculate_hash,
+    calculate_hashes,
+    iter_hashes,
+    resolve_algorithms,
+)
+from hash_daemon import DEFAULT_LRU_ENTRIES, DigestLRU, HashDaemon, HashService
+from hash_index import KnownHashIndex
+from hash_stats import DEFAULT_PROGRESS_THRESHOLD, HashStats
+from piece_table import (
+    DEFAULT_PIECE_SIZE,
+    PROGRESS_SUFFIX,
+    PieceTable,
+    is_sidecar_file,
+    sidecar_path,
+    verify_pieces,
+)
+from tree_hash import DEFAULT_LEAF_SIZE, format_tree_digest, parse_tree_digest, tree_hash_file
+from watch import DELETED, TreeWatcher
 
-# Top 5 hash algorithms
-HASH_ALGORITHMS = {
-    "1": ("MD5", hashlib.md5),
-    "2": ("SHA1", hashlib.sha1),
-    "3": ("SHA256", hashlib.sha256),
-    "4": ("SHA384", hashlib.sha384),
-    "5": ("SHA512", hashlib.sha512),
-}
 
+# Bytes read from each end of a file for the duplicate finder's cheap digest
+PARTIAL_BLOCK_SIZE = 64 * 1024
+
+# Buffer size for the in-memory algorithm ranking
+RANKING_BUFFER_SIZE = 4 * 1024 * 1024
 
 def get_filename() -> str:
     """Prompt user for full file path."""
@@ -41,30 +84,18 @@ def display_menu() -> str:
     print("\n" + "="*50)
     print("Select Hash Algorithm:")
     print("="*50)
-    for key, (name, _) in HASH_ALGORITHMS.items():
-        print(f"{key}. {name}")
-    print("6. All 5 algorithms")
+    entries = {key: name for key, (name, _) in HASH_ALGORITHMS.items()}
+    entries[ALL_CHOICE] = f"All {len(HASH_ALGORITHMS)} algorithms"
+    for key in sorted(entries, key=int):
+        print(f"{key}. {entries[key]}")
     print("="*50)
+    last = max(entries, key=int)
     
     while True:
-        choice = input("\nEnter your choice (1-6): ").strip()
-        if choice in HASH_ALGORITHMS.keys() or choice == "6":
+        choice = input(f"\nEnter your choice (1-{last}): ").strip()
+        if choice in entries:
             return choice
-        print("Invalid choice. Please enter a number between 1 and 6.")
-
-
-def calculate_hash(file_path: Path, hash_func) -> str:
-    """Calculate hash for a file using the given hash function."""
-    hash_obj = hash_func()
-    
-    try:
-        with open(file_path, 'rb') as f:
-            # Read file in chunks to handle large files efficiently
-            for chunk in iter(lambda: f.read(4096), b''):
-                hash_obj.update(chunk)
-        return hash_obj.hexdigest()
-    except IOError as e:
-        raise IOError(f"Error reading file: {e}")
+        print(f"Invalid choice. Please enter a number between 1 and {last}.")
 
 
 def display_results(filename: str, selected_choice: str):
@@ -75,16 +106,19 @@ def display_results(filename: str, selected_choice: str):
     print(f"Hash Results for: {filename}")
     print("="*50)
     
-    if selected_choice == "6":
-        # Calculate all 5 hashes
-        for key in sorted(HASH_ALGORITHMS.keys()):
-            name, hash_func = HASH_ALGORITHMS[key]
-            try:
-                hash_value = calculate_hash(file_path, hash_func)
-                print(f"\n{name}:")
-                print(f"  {hash_value}")
-            except IOError as e:
-                print(f"\n{name}: Error - {e}")
+    if selected_choice == ALL_CHOICE:
+        # Calculate all hashes in one pass over the file
+        hash_funcs = dict(HASH_ALGORITHMS.values())
+        try:
+            results = calculate_hashes(
+                file_path, hash_funcs, threaded=(os.cpu_count() or 1) > 1
+            )
+        except IOError as e:
+            print(f"Error: {e}")
+            results = {}
+        for name, hash_value in results.items():
+            print(f"\n{name}:")
+            print(f"  {hash_value}")
     else:
         # Calculate selected hash
         name, hash_func = HASH_ALGORITHMS[selected_choice]
@@ -98,8 +132,705 @@ def display_results(filename: str, selected_choice: str):
     print("\n" + "="*50)
 
 
-def main():
-    """Main function to run the CLI tool."""
+def calculate_partial_hash(
+    file_path: Path,
+    hash_func,
+    block_size: int = PARTIAL_BLOCK_SIZE
+) -> str:
+    """
+    Hash only the first and last block of a file.
+
+    Files no larger than two blocks are hashed completely, so the result
+    equals calculate_hash() for them.
+    """
+    hash_obj = hash_func()
+
+    try:
+        with open(file_path, 'rb', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= 2 * block_size:
+                _update_from_reads(f, [hash_obj])
+            else:
+                hash_obj.update(f.read(block_size))
+                f.seek(size - block_size)
+                hash_obj.update(f.read(block_size))
+        return hash_obj.hexdigest()
+    except IOError as e:
+        raise IOError(f"Error reading file: {e}")
+
+
+def find_duplicates(
+    paths: Iterable[Path],
+    hash_funcs: Dict[str, Callable],
+    workers: int = 1,
+    use_processes: bool = False,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> Dict:
+    """
+    Find duplicate files with a size, partial-hash, full-hash cascade.
+
+    Files are grouped by size first; only same-size files get a cheap digest
+    of their first and last block, and only files that still collide are
+    hashed in full. Empty files are ignored, and hard links to the same
+    inode count as one file.
+
+    Args:
+        paths: Files to compare
+        hash_funcs: Single-entry mapping of the algorithm used for both digest stages
+        workers: Number of workers (0 = one per CPU, 1 = no pool)
+        use_processes: Use a process pool for the full-hash stage
+        options: How files are read in the full-hash stage, which is also
+            the only stage recorded by options.stats
+
+    Returns:
+        Dictionary with the duplicate "groups" (size, digest, paths), the
+        number of "duplicate_files", "reclaimable_bytes", "bytes_read" and
+        any per-file "errors"
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    name, hash_func = next(iter(hash_funcs.items()))
+
+    errors = []
+    bytes_read = 0
+
+    # Stage 1: group by size, skipping extra hard links to the same inode
+    by_size = {}
+    seen_inodes = set()
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            errors.append({"path": str(path), "error": str(e)})
+            continue
+        if not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+            continue
+        inode = (st.st_dev, st.st_ino)
+        if inode in seen_inodes:
+            continue
+        seen_inodes.add(inode)
+        by_size.setdefault(st.st_size, []).append(path)
+
+    # Stage 2: cheap digest of the first and last block
+    candidates = [
+        (size, path) for size, group in by_size.items() if len(group) > 1 for path in group
+    ]
+
+    def partial(item):
+        size, path = item
+        try:
+            return size, path, calculate_partial_hash(path, hash_func), None
+        except IOError as e:
+            return size, path, None, str(e)
+
+    by_partial = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for size, path, digest, error in executor.map(partial, candidates):
+            if error is not None:
+                errors.append({"path": str(path), "error": error})
+                continue
+            bytes_read += min(size, 2 * PARTIAL_BLOCK_SIZE)
+            by_partial.setdefault((size, digest), []).append(path)
+
+    # Stage 3: full hash, except where the partial digest already covered the file
+    groups = []
+    full_paths = []
+    sizes = {}
+    for (size, digest), group in by_partial.items():
+        if len(group) < 2:
+            continue
+        if size <= 2 * PARTIAL_BLOCK_SIZE:
+            groups.append({"size": size, "digest": digest, "paths": group})
+            continue
+        for path in group:
+            sizes[path] = size
+            full_paths.append(path)
+
+    by_full = {}
+    for path, digests, error in iter_hashes(
+        full_paths, hash_funcs, workers, use_processes, options=options
+    ):
+        if error is not None:
+            errors.append({"path": str(path), "error": error})
+            continue
+        bytes_read += sizes[path]
+        by_full.setdefault((sizes[path], digests[name]), []).append(path)
+
+    for (size, digest), group in by_full.items():
+        if len(group) > 1:
+            groups.append({"size": size, "digest": digest, "paths": group})
+
+    groups.sort(key=lambda g: g["size"] * (len(g["paths"]) - 1), reverse=True)
+    for group in groups:
+        group["paths"] = sorted(str(p) for p in group["paths"])
+
+    return {
+        "algorithm": name,
+        "groups": groups,
+        "duplicate_files": sum(len(g["paths"]) - 1 for g in groups),
+        "reclaimable_bytes": sum(g["size"] * (len(g["paths"]) - 1) for g in groups),
+        "bytes_read": bytes_read,
+        "errors": errors,
+    }
+
+
+def rank_algorithms(
+    secure_only: bool = False,
+    buffer_size: int = RANKING_BUFFER_SIZE,
+    repeat: int = 3
+) -> List[Tuple[str, float]]:
+    """
+    Rank the registered algorithms by throughput on this machine.
+
+    Hashes an in-memory buffer with each algorithm, so the result reflects
+    the CPU (e.g. SHA extensions, 64-bit BLAKE2b) rather than storage.
+
+    Args:
+        secure_only: Skip algorithms listed in INSECURE_ALGORITHMS
+        buffer_size: Bytes hashed per measurement
+        repeat: Measurements per algorithm; the best is kept
+
+    Returns:
+        (name, MiB/s) pairs, fastest first
+    """
+    data = os.urandom(buffer_size)
+    ranking = []
+    for name, hash_func in HASH_ALGORITHMS.values():
+        if secure_only and name in INSECURE_ALGORITHMS:
+            continue
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hash_func(data).digest()
+            best = min(best, time.perf_counter() - start)
+        ranking.append((name, buffer_size / (1024 * 1024) / max(best, 1e-9)))
+    ranking.sort(key=lambda item: item[1], reverse=True)
+    return ranking
+
+
+def iter_paths(patterns: Iterable[str], recursive: bool = False) -> Iterator[Path]:
+    """
+    Expand command line paths into the files to hash, lazily.
+
+    Glob patterns are expanded ("**" matches across directories) and
+    directories are walked in sorted order when recursive is set. Piece-table
+    sidecars found by globs and walks are skipped, so they never end up
+    hashed, or given sidecars of their own. Anything that does not resolve
+    to a file is yielded as-is so the caller reports the error for it in
+    sequence.
+    """
+    for pattern in patterns:
+        is_glob = any(c in pattern for c in "*?[")
+        if is_glob:
+            candidates = [
+                Path(match) for match in sorted(glob.iglob(pattern, recursive=True))
+                if not is_sidecar_file(match)
+            ]
+            if not candidates:
+                # Report unmatched patterns like a missing file
+                yield Path(pattern)
+        else:
+            candidates = [Path(pattern)]
+
+        for path in candidates:
+            if path.is_dir():
+                if recursive:
+                    for root, dirs, files in os.walk(path):
+                        dirs.sort()
+                        for name in sorted(files):
+                            if not is_sidecar_file(name):
+                                yield Path(root) / name
+                elif not is_glob:
+                    # Explicit directories are reported; glob matches are skipped
+                    yield path
+            else:
+                yield path
+
+
+def format_result(path: Path, digests: Dict[str, str]) -> str:
+    """
+    Format one output line: the digests in order, then the path.
+
+    With a single digest this is the sha256sum format. Paths containing a
+    backslash or newline are escaped and the line prefixed with a
+    backslash, as GNU coreutils does.
+    """
+    name = str(path)
+    prefix = ""
+    if "\\" in name or "\n" in name:
+        name = name.replace("\\", "\\\\").replace("\n", "\\n")
+        prefix = "\\"
+    return prefix + " ".join(digests.values()) + "  " + name
+
+
+def parse_manifest_line(line: str) -> Tuple[str, str]:
+    """
+    Parse a "<hex>  <path>" manifest line (sha256sum format).
+
+    Accepts the binary-mode marker ("<hex> *<path>"), escaped paths, and
+    tree digests ("tree-v1:...") or fingerprints ("fp-v1:...") in place of
+    the hex digest.
+
+    Returns:
+        (hex digest, path)
+
+    Raises:
+        ValueError: If the line is not in manifest format
+    """
+    line = line.rstrip("\n")
+    escaped = line.startswith("\\")
+    if escaped:
+        line = line[1:]
+    digest, sep, name = line.partition(" ")
+    if not sep or not name or name[0] not in " *" or len(name) < 2:
+        raise ValueError(f"Improperly formatted manifest line: {line!r}")
+    try:
+        if digest.startswith("tree-"):
+            parse_tree_digest(digest)
+        elif digest.startswith("fp-"):
+            parse_fingerprint(digest)
+        else:
+            int(digest, 16)
+    except ValueError:
+        raise ValueError(f"Improperly formatted manifest line: {line!r}")
+    name = name[1:]
+    if escaped:
+        name = name.replace("\\\\", "\0").replace("\\n", "\n").replace("\0", "\\")
+    return digest.lower(), name
+
+
+def algorithms_for_digest(digest: str) -> Dict[str, Callable]:
+    """
+    Find the algorithms that could have produced a hex digest, from its length.
+
+    Several algorithms share a length (SHA256, BLAKE2s and SHA3_256 all
+    produce 64 hex digits), so more than one may be returned.
+
+    Returns:
+        Mapping of algorithm name to hash constructor, in registry order
+
+    Raises:
+        ValueError: If no algorithm in HASH_ALGORITHMS produces digests of that length
+    """
+    candidates = {
+        name: hash_func
+        for name, hash_func in HASH_ALGORITHMS.values()
+        if hash_func().digest_size * 2 == len(digest)
+    }
+    if not candidates:
+        raise ValueError(f"No hash algorithm produces {len(digest) * 4}-bit digests")
+    return candidates
+
+
+def _detect_manifest_algorithm(
+    expected: Dict[Path, List[str]],
+    candidates: Dict[str, Callable],
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> Dict[str, Callable]:
+    """
+    Narrow the candidate algorithms of a manifest down to the one it was written with.
+
+    The first listed file that can be read is hashed with every candidate in
+    one pass. If none of them matches its recorded digest, that file tells
+    nothing about the algorithm and all candidates are kept, so every file
+    is checked against each of them and is only FAILED if none matches.
+    """
+    # The probe is not part of the verification proper; keep it out of --stats
+    options = replace(options, stats=None)
+    for path, wanted in expected.items():
+        try:
+            digests = calculate_hashes(path, candidates, options=options)
+        except IOError:
+            continue
+        for name, digest in digests.items():
+            if digest in wanted:
+                return {name: candidates[name]}
+        break
+    return candidates
+
+
+def iter_tree_hashes(
+    paths: Iterable[Path],
+    hash_funcs: Dict[str, Callable],
+    leaf_size: int = DEFAULT_LEAF_SIZE,
+    workers: int = 0
+) -> Iterator[Tuple[Path, Optional[Dict[str, str]], Optional[str]]]:
+    """
+    Tree-hash files one at a time, each split across all workers.
+
+    Yields (path, digests, error) like iter_hashes(), with the formatted
+    tree digest (see tree_hash.py) in place of the standard hex digest.
+    """
+    name, hash_func = next(iter(hash_funcs.items()))
+    for path in paths:
+        try:
+            root = tree_hash_file(path, hash_func, leaf_size, workers)
+        except IOError as e:
+            yield path, None, str(e)
+            continue
+        yield path, {name: format_tree_digest(name, leaf_size, root)}, None
+
+
+def iter_fingerprints(
+    paths: Iterable[Path],
+    hash_funcs: Dict[str, Callable],
+    samples: int = DEFAULT_SAMPLES,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    workers: int = 1
+) -> Iterator[Tuple[Path, Optional[Dict[str, str]], Optional[str]]]:
+    """
+    Fingerprint files from their size and a few samples (see fingerprint.py).
+
+    Yields (path, digests, error) like iter_hashes(), with the formatted
+    fingerprint in place of the standard hex digest. Sampling is dominated
+    by seek latency, so workers > 1 overlaps the reads of several files;
+    results then arrive out of order.
+    """
+    name, hash_func = next(iter(hash_funcs.items()))
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    def one(path: Path) -> Tuple[Path, Optional[Dict[str, str]], Optional[str]]:
+        try:
+            digest = fingerprint_file(path, hash_func, samples, sample_size)
+        except IOError as e:
+            return path, None, str(e)
+        return path, {name: format_fingerprint(name, samples, sample_size, digest)}, None
+
+    if workers == 1:
+        for path in paths:
+            yield one(path)
+        return
+
+    paths = iter(paths)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        try:
+            while True:
+                for path in paths:
+                    pending.add(executor.submit(one, path))
+                    if len(pending) >= workers * 4:
+                        break
+                if not pending:
+                    break
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def verify_manifest(
+    manifest_path: Path,
+    hash_funcs: Optional[Dict[str, Callable]] = None,
+    workers: int = 1,
+    use_processes: bool = False,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+) -> Dict[str, int]:
+    """
+    Verify the files listed in a manifest, printing one status line per file.
+
+    Each file is reported as OK, FAILED (digest mismatch) or MISSING. Any
+    other read error stops the verification early, since it usually means
+    the storage itself is failing. Manifests of tree digests or
+    fingerprints are verified with the parameters of their first entry.
+
+    Args:
+        manifest_path: Manifest in "<hex>  <path>" format
+        hash_funcs: Single-entry mapping naming the algorithm, or None to
+            detect it from the digest length; when several algorithms share
+            that length, a file matching any of them is OK
+        workers: Number of workers (0 = one per CPU, 1 = no pool)
+        use_processes: Use a process pool instead of a thread pool
+        options: How each file is read
+
+    Returns:
+        Counts of "ok", "failed", "missing", "malformed" and "errors"
+    """
+    counts = {"ok": 0, "failed": 0, "missing": 0, "malformed": 0, "errors": 0}
+    expected = {}
+
+    with open(manifest_path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                digest, name = parse_manifest_line(line)
+            except ValueError as e:
+                print(f"{manifest_path}: {e}", file=sys.stderr)
+                counts["malformed"] += 1
+                continue
+            expected.setdefault(Path(name), []).append(digest)
+
+    if not expected:
+        return counts
+
+    first = next(iter(expected.values()))[0]
+    if first.startswith(("tree-", "fp-")) and options != DEFAULT_READ_OPTIONS:
+        raise ValueError(
+            "Tree-digest and fingerprint manifests do not support --stats, --progress, "
+            "--queue-depth or --no-cache-pollution"
+        )
+    if first.startswith("tree-"):
+        name, leaf_size, _ = parse_tree_digest(first)
+        hash_funcs = resolve_algorithms([name])
+        results = iter_tree_hashes(expected, hash_funcs, leaf_size, workers)
+    elif first.startswith("fp-"):
+        name, samples, sample_size, _ = parse_fingerprint(first)
+        hash_funcs = resolve_algorithms([name])
+        results = iter_fingerprints(expected, hash_funcs, samples, sample_size, workers)
+    else:
+        if hash_funcs is None:
+            hash_funcs = algorithms_for_digest(first)
+            if len(hash_funcs) > 1:
+                hash_funcs = _detect_manifest_algorithm(expected, hash_funcs, options)
+        results = iter_hashes(
+            expected, hash_funcs, workers, use_processes, options=options
+        )
+
+    for path, digests, error in results:
+        wanted = expected[path]
+        if error is not None:
+            if not os.path.lexists(path):
+                print(f"{path}: MISSING")
+                counts["missing"] += len(wanted)
+                continue
+            print(f"{path}: FAILED read: {error}")
+            print("Stopping verification after I/O error", file=sys.stderr)
+            counts["errors"] += 1
+            break
+        for digest in wanted:
+            if digest in digests.values():
+                print(f"{path}: OK")
+                counts["ok"] += 1
+            else:
+                print(f"{path}: FAILED")
+                counts["failed"] += 1
+
+    return counts
+
+
+def run_batch(
+    paths: List[str],
+    hash_funcs: Dict[str, Callable],
+    recursive: bool = False,
+    workers: int = 1,
+    use_processes: bool = False,
+    cache: Optional[HashCache] = None,
+    output=None,
+    tree_leaf_size: Optional[int] = None,
+    piece_size: Optional[int] = None,
+    options: ReadOptions = DEFAULT_READ_OPTIONS,
+    keep: Optional[Callable[[Dict[str, str]], bool]] = None,
+    fingerprint: Optional[Tuple[int, int]] = None
+) -> int:
+    """
+    Hash many files non-interactively, printing one line per file.
+
+    Lines go to output (default: stdout); with a single algorithm they form
+    a sha256sum-compatible manifest. With tree_leaf_size set, files get
+    tree digests instead, each file spread across all workers. With
+    piece_size set, a piece-table sidecar is written for every file. With
+    keep set, only files for whose digests it returns True are printed.
+    With fingerprint set to (samples, sample size), files get sampled
+    fingerprints instead of full digests.
+
+    Returns:
+        Number of files that could not be hashed
+    """
+    errors = 0
+    if tree_leaf_size:
+        results = iter_tree_hashes(
+            iter_paths(paths, recursive), hash_funcs, tree_leaf_size, workers
+        )
+    elif fingerprint:
+        results = iter_fingerprints(
+            iter_paths(paths, recursive), hash_funcs, fingerprint[0], fingerprint[1], workers
+        )
+    else:
+        results = iter_hashes(
+            iter_paths(paths, recursive), hash_funcs, workers, use_processes, cache,
+            piece_size, options
+        )
+    for path, digests, error in results:
+        if error is not None:
+            print(f"{path}: {error}", file=sys.stderr)
+            errors += 1
+            continue
+        if keep is None or keep(digests):
+            print(format_result(path, digests), file=output or sys.stdout)
+    return errors
+
+
+def parse_byte_range(text: str) -> Tuple[int, int]:
+    """
+    Parse a "START:END" byte range (END exclusive; empty END = end of file).
+
+    Raises:
+        ValueError: If the range is malformed
+    """
+    start, sep, end = text.partition(":")
+    if not sep:
+        raise ValueError(f"Byte range must be START:END, got {text!r}")
+    start = int(start) if start else 0
+    end = int(end) if end else -1
+    if start < 0 or (end != -1 and end <= start):
+        raise ValueError(f"Invalid byte range: {text!r}")
+    return start, end
+
+
+def run_verify_pieces(
+    paths: Iterable[Path],
+    ranges: Optional[List[Tuple[int, int]]] = None
+) -> int:
+    """
+    Verify files against their piece-table sidecars, printing one line per file.
+
+    Only pieces overlapping the given byte ranges are read, if any are given.
+    Interrupted verifications resume from their last checkpoint.
+
+    Returns:
+        Number of files that failed or could not be verified
+    """
+    failures = 0
+    for path in paths:
+        try:
+            table = PieceTable.load(sidecar_path(path))
+        except FileNotFoundError:
+            print(f"{path}: MISSING piece table {sidecar_path(path)}")
+            failures += 1
+            continue
+        except (IOError, ValueError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            failures += 1
+            continue
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            print(f"{path}: MISSING")
+            failures += 1
+            continue
+        if st.st_size != table.size or st.st_mtime_ns != table.mtime_ns:
+            print(f"{path}: warning: changed since its piece table was recorded", file=sys.stderr)
+
+        indices = None
+        if ranges:
+            indices = set()
+            for start, end in ranges:
+                indices.update(table.pieces_for_range(start, table.size if end == -1 else end))
+
+        progress = Path(str(sidecar_path(path)) + PROGRESS_SUFFIX)
+        try:
+            bad, checked = verify_pieces(path, table, indices, progress)
+        except IOError as e:
+            print(f"{path}: FAILED read: {e} (progress saved, rerun to resume)")
+            failures += 1
+            continue
+
+        if st.st_size != table.size:
+            print(f"{path}: FAILED size {st.st_size}, expected {table.size}")
+            failures += 1
+        elif bad:
+            spans = ", ".join(
+                f"{i} [{table.piece_range(i)[0]}:{table.piece_range(i)[1]}]" for i in bad
+            )
+            print(f"{path}: FAILED pieces {spans}")
+            failures += 1
+        else:
+            print(f"{path}: OK ({checked} pieces checked)")
+    return failures
+
+
+def run_daemon(
+    socket_path: Path,
+    lru_entries: int = DEFAULT_LRU_ENTRIES,
+    kernel_crypto: bool = False,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+):
+    """
+    Serve hash requests on a Unix socket until interrupted or terminated.
+
+    See hash_daemon.py for the protocol; `python hash_daemon.py SOCKET FILE...`
+    is the matching client.
+    """
+    def resolve(names):
+        hash_funcs = resolve_algorithms(names)
+        return kernel_constructors(hash_funcs) if kernel_crypto else hash_funcs
+
+    def hash_file(path, hash_funcs):
+        return calculate_hashes(path, hash_funcs, options=options)
+
+    cache = DigestLRU(lru_entries)
+    server = HashDaemon(socket_path, HashService(hash_file, resolve, iter_paths, cache))
+    # Let SIGTERM unwind through serve_forever() so the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Serving on {socket_path} (LRU cache: {lru_entries} entries)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(
+            f"Daemon stopped: {cache.hits} hits, {cache.misses} misses, "
+            f"{len(cache)} digests cached",
+            file=sys.stderr
+        )
+
+
+def run_watch(
+    roots: List[str],
+    hash_funcs: Dict[str, Callable],
+    interval: float = 2.0,
+    trust_dir_mtime: bool = False,
+    workers: int = 1,
+    use_processes: bool = False,
+    cache: Optional[HashCache] = None,
+    options: ReadOptions = DEFAULT_READ_OPTIONS
+):
+    """
+    Poll a set of trees and print a JSON line for every file change until interrupted.
+
+    The first scan reports every existing file as added. Added and modified
+    files are hashed again; unchanged files are never read. Event lines are
+    {"event", "path", "digests"} or, for failures, {"event", "path", "error"};
+    deleted files have neither digests nor error.
+    """
+    watcher = TreeWatcher([Path(root) for root in roots], trust_dir_mtime, is_sidecar_file)
+    try:
+        while True:
+            started = time.monotonic()
+            events = dict()
+            for event, path in watcher.scan():
+                events[path] = event
+
+            changed = []
+            for path, event in events.items():
+                if event == DELETED:
+                    print(json.dumps({"event": event, "path": str(path)}), flush=True)
+                else:
+                    changed.append(path)
+            for path, digests, error in iter_hashes(
+                changed, hash_funcs, workers, use_processes, cache, options=options
+            ):
+                line = {"event": events[path], "path": str(path)}
+                if error is None:
+                    line["digests"] = digests
+                else:
+                    line["error"] = error
+                print(json.dumps(line), flush=True)
+
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_interactive():
+    """Run the interactive prompt-driven tool."""
     print("="*50)
     print("File Hash Generator")
     print("="*50)
@@ -119,6 +850,513 @@ def main():
     print("\nDone!")
 
 
+def main():
+    """Main function to run the CLI tool."""
+    parser = argparse.ArgumentParser(
+        description="Generate file hashes. Runs interactively when no paths are given."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help="Files, directories or glob patterns to hash"
+    )
+    parser.add_argument(
+        "-a", "--algorithm",
+        action="append",
+        metavar="NAME",
+        help="Hash algorithm name or menu number, comma-separated or repeated; "
+             "'all' selects every algorithm (default: SHA256)"
+    )
+    parser.add_argument(
+        "--fastest-secure",
+        action="store_true",
+        help="Use the fastest non-MD5/SHA1 algorithm on this machine, chosen by a "
+             "quick in-memory benchmark"
+    )
+    parser.add_argument(
+        "--rank-algorithms",
+        action="store_true",
+        help="Benchmark the available algorithms on this machine and exit"
+    )
+    parser.add_argument(
+        "-r", "--recursive",
+        action="store_true",
+        help="Hash all files below directories"
+    )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Hash N files concurrently; 0 uses one worker per CPU (default: 1). "
+             "Output order follows completion order when N > 1"
+    )
+    parser.add_argument(
+        "--processes",
+        action="store_true",
+        help="Use a process pool instead of threads (faster for many small files)"
+    )
+    parser.add_argument(
+        "--kernel-crypto",
+        action="store_true",
+        help="Hash in the Linux kernel through AF_ALG where the kernel offers the "
+             "algorithm (zero-copy splice for single algorithms); others use hashlib"
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Keep N reads in flight ahead of the hasher, for NVMe and network "
+             "block storage (default: 0, plain mmap/sequential reads)"
+    )
+    parser.add_argument(
+        "--no-cache-pollution",
+        action="store_true",
+        help="Drop hashed data from the page cache as it is read, so background "
+             "sweeps do not evict other workloads' cached pages"
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Time reads and hash updates per algorithm and print a JSON summary "
+             "to stderr at exit (threads only)"
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Show a progress bar (tqdm) for large files"
+    )
+    parser.add_argument(
+        "--progress-threshold",
+        type=int,
+        default=DEFAULT_PROGRESS_THRESHOLD,
+        metavar="BYTES",
+        help=f"Smallest file that gets a progress bar (default: {DEFAULT_PROGRESS_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="DB",
+        help="SQLite digest cache; files unchanged since the last run are not reread"
+    )
+    parser.add_argument(
+        "--prune-cache",
+        action="store_true",
+        help="Evict cache entries whose files are gone or changed (requires --cache)"
+    )
+    parser.add_argument(
+        "--tree-hash",
+        action="store_true",
+        help="Split each file into leaves hashed in parallel and print a Merkle "
+             "root (tree-v1 format, not a standard digest; see tree_hash.py)"
+    )
+    parser.add_argument(
+        "--leaf-size",
+        type=int,
+        default=DEFAULT_LEAF_SIZE,
+        metavar="BYTES",
+        help=f"Leaf size for --tree-hash (default: {DEFAULT_LEAF_SIZE})"
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Hash only the size and a few samples of each file, for fast change "
+             "detection (fp-v1 format, NOT a full-content digest; see fingerprint.py)"
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=DEFAULT_SAMPLES,
+        metavar="N",
+        help=f"Samples per file for --fingerprint, including head and tail "
+             f"(default: {DEFAULT_SAMPLES})"
+    )
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=DEFAULT_SAMPLE_SIZE,
+        metavar="BYTES",
+        help=f"Bytes per sample for --fingerprint (default: {DEFAULT_SAMPLE_SIZE})"
+    )
+    parser.add_argument(
+        "--pieces",
+        action="store_true",
+        help="Also record per-piece digests in a '<file>.pieces.json' sidecar, "
+             "in the same read pass"
+    )
+    parser.add_argument(
+        "--piece-size",
+        type=int,
+        default=DEFAULT_PIECE_SIZE,
+        metavar="BYTES",
+        help=f"Piece size for --pieces (default: {DEFAULT_PIECE_SIZE})"
+    )
+    parser.add_argument(
+        "--verify-pieces",
+        action="store_true",
+        help="Verify files against their piece-table sidecars; resumes an "
+             "interrupted verification"
+    )
+    parser.add_argument(
+        "--piece-range",
+        action="append",
+        metavar="START:END",
+        help="With --verify-pieces, only check pieces overlapping this byte range "
+             "(repeatable)"
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Report duplicate files as JSON instead of printing digests"
+    )
+    parser.add_argument(
+        "--cdc",
+        action="store_true",
+        help="Split files into content-defined chunks and report the dedup ratio "
+             "across them as JSON"
+    )
+    parser.add_argument(
+        "--cdc-avg-size",
+        type=int,
+        default=DEFAULT_AVG_CHUNK_SIZE,
+        metavar="BYTES",
+        help=f"Approximate average chunk size for --cdc, a power of two "
+             f"(default: {DEFAULT_AVG_CHUNK_SIZE})"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep polling the given paths and print a JSON line with fresh digests "
+             "for every added, modified or deleted file"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="Time between --watch scans (default: 2)"
+    )
+    parser.add_argument(
+        "--trust-dir-mtime",
+        action="store_true",
+        help="With --watch, skip directories whose mtime is unchanged; fast on huge "
+             "trees, but misses files rewritten in place"
+    )
+    parser.add_argument(
+        "--known",
+        metavar="INDEX",
+        help="Only print files whose digest is in this known-hash index "
+             "(built with hash_index.py)"
+    )
+    parser.add_argument(
+        "--unknown",
+        metavar="INDEX",
+        help="Only print files whose digest is NOT in this known-hash index"
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        help="Run as a daemon answering hash requests on this Unix socket, with "
+             "an in-memory digest cache (client: hash_daemon.py)"
+    )
+    parser.add_argument(
+        "--lru-size",
+        type=int,
+        default=DEFAULT_LRU_ENTRIES,
+        metavar="N",
+        help=f"Digests kept in memory by --serve (default: {DEFAULT_LRU_ENTRIES})"
+    )
+    parser.add_argument(
+        "-o", "--manifest",
+        metavar="FILE",
+        help="Write a '<hex>  <path>' checksum manifest to FILE (one algorithm only)"
+    )
+    parser.add_argument(
+        "-c", "--check",
+        metavar="MANIFEST",
+        help="Verify the files listed in a checksum manifest; the algorithm is "
+             "detected from the digest length unless -a is given"
+    )
+
+    args = parser.parse_intermixed_args()
+
+    if args.prune_cache and not args.cache:
+        parser.error("--prune-cache requires --cache")
+
+    if args.rank_algorithms:
+        print("=" * 50)
+        print("Algorithm throughput on this machine:")
+        print("=" * 50)
+        for name, speed in rank_algorithms():
+            marker = "" if name not in INSECURE_ALGORITHMS else "  (insecure)"
+            print(f"{name:<10} {speed:10.1f} MiB/s{marker}")
+        print("=" * 50)
+        return
+
+    stats = None
+    if args.stats or args.progress:
+        if args.processes:
+            parser.error("--stats and --progress cannot be combined with --processes")
+        stats = HashStats(args.progress, args.progress_threshold)
+
+    def report_stats_at_exit():
+        # Called by each mode once its arguments are valid, so usage errors print no stats
+        if args.stats:
+            atexit.register(
+                lambda: print(json.dumps({"stats": stats.summary()}), file=sys.stderr)
+            )
+
+    if args.serve:
+        if args.paths:
+            parser.error("--serve takes no paths; clients send them")
+        if args.lru_size <= 0:
+            parser.error("--lru-size must be positive")
+        if args.queue_depth < 0:
+            parser.error("--queue-depth must be 0 or greater")
+        report_stats_at_exit()
+        try:
+            run_daemon(
+                Path(args.serve),
+                args.lru_size,
+                args.kernel_crypto,
+                ReadOptions(
+                    queue_depth=args.queue_depth,
+                    no_cache_pollution=args.no_cache_pollution,
+                    stats=stats
+                )
+            )
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    if args.verify_pieces and not args.paths:
+        # Piece tables live next to files; there is nothing to prompt for
+        parser.error("--verify-pieces needs at least one path")
+    if args.watch and not args.paths:
+        parser.error("--watch needs at least one path")
+    if not args.paths and not args.prune_cache and not args.check:
+        run_interactive()
+        return
+
+    if args.fastest_secure and args.algorithm:
+        parser.error("--fastest-secure cannot be combined with -a")
+    if args.fastest_secure:
+        name, speed = rank_algorithms(secure_only=True)[0]
+        print(f"Fastest secure algorithm: {name} ({speed:.0f} MiB/s)", file=sys.stderr)
+        args.algorithm = [name]
+
+    try:
+        hash_funcs = resolve_algorithms(args.algorithm or ["sha256"])
+    except ValueError as e:
+        parser.error(str(e))
+    if not hash_funcs:
+        parser.error("No hash algorithm selected")
+    if args.kernel_crypto:
+        hash_funcs = kernel_constructors(hash_funcs)
+        for name, hash_func in hash_funcs.items():
+            backend = "AF_ALG" if isinstance(hash_func, AfAlgConstructor) else "hashlib"
+            print(f"{name}: {backend} backend", file=sys.stderr)
+    if args.workers < 0:
+        parser.error("--workers must be 0 or greater")
+    if (args.manifest or args.check) and len(hash_funcs) != 1:
+        parser.error("Manifests use exactly one hash algorithm")
+    if args.dedupe and len(hash_funcs) != 1:
+        parser.error("--dedupe uses exactly one hash algorithm")
+    if args.tree_hash and len(hash_funcs) != 1:
+        parser.error("--tree-hash uses exactly one hash algorithm")
+    if args.tree_hash and (args.cache or args.dedupe):
+        parser.error("--tree-hash cannot be combined with --cache or --dedupe")
+    if args.leaf_size <= 0:
+        parser.error("--leaf-size must be positive")
+    if args.queue_depth < 0:
+        parser.error("--queue-depth must be 0 or greater")
+    options = ReadOptions(
+        queue_depth=args.queue_depth,
+        no_cache_pollution=args.no_cache_pollution,
+        stats=stats
+    )
+    if args.piece_size <= 0:
+        parser.error("--piece-size must be positive")
+    if args.pieces and (args.cache or args.tree_hash or args.dedupe):
+        parser.error("--pieces cannot be combined with --cache, --tree-hash or --dedupe")
+    if args.piece_range and not args.verify_pieces:
+        parser.error("--piece-range requires --verify-pieces")
+    # These modes read files themselves, not through ReadOptions
+    own_readers = [
+        flag for flag, used in (
+            ("--tree-hash", args.tree_hash),
+            ("--fingerprint", args.fingerprint),
+            ("--cdc", args.cdc),
+            ("--verify-pieces", args.verify_pieces),
+        ) if used
+    ]
+    reader_flags = [
+        flag for flag, used in (
+            ("--stats", args.stats),
+            ("--progress", args.progress),
+            ("--queue-depth", args.queue_depth > 0),
+            ("--no-cache-pollution", args.no_cache_pollution),
+        ) if used
+    ]
+    if own_readers and reader_flags:
+        parser.error(f"{own_readers[0]} cannot be combined with {', '.join(reader_flags)}")
+    if args.fingerprint:
+        if len(hash_funcs) != 1:
+            parser.error("--fingerprint uses exactly one hash algorithm")
+        if args.samples < 2 or args.sample_size <= 0:
+            parser.error("--fingerprint needs --samples >= 2 and a positive --sample-size")
+        if (args.tree_hash or args.pieces or args.cache or args.dedupe or args.cdc
+                or args.watch or args.known or args.unknown):
+            parser.error(
+                "--fingerprint cannot be combined with --tree-hash, --pieces, --cache, "
+                "--dedupe, --cdc, --watch, --known or --unknown"
+            )
+        print(
+            f"Fingerprint mode: size plus {args.samples} samples of {args.sample_size} "
+            "bytes per file; these are not full-content digests",
+            file=sys.stderr
+        )
+    if args.known and args.unknown:
+        parser.error("--known and --unknown cannot be combined")
+    if (args.known or args.unknown) and (len(hash_funcs) != 1 or args.tree_hash):
+        parser.error("--known and --unknown need exactly one standard hash algorithm")
+
+    if args.watch:
+        if args.tree_hash or args.pieces or args.manifest or args.known or args.unknown:
+            parser.error(
+                "--watch cannot be combined with --tree-hash, --pieces, -o, "
+                "--known or --unknown"
+            )
+        if args.interval <= 0:
+            parser.error("--interval must be positive")
+        report_stats_at_exit()
+        cache = HashCache(Path(args.cache)) if args.cache else None
+        try:
+            run_watch(
+                args.paths, hash_funcs, args.interval, args.trust_dir_mtime,
+                args.workers, args.processes, cache, options
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+        return
+
+    if args.verify_pieces:
+        try:
+            ranges = [parse_byte_range(r) for r in args.piece_range or []]
+        except ValueError as e:
+            parser.error(str(e))
+        report_stats_at_exit()
+        if run_verify_pieces(iter_paths(args.paths, args.recursive), ranges):
+            sys.exit(1)
+        return
+
+    if args.cdc:
+        if len(hash_funcs) != 1:
+            parser.error("--cdc uses exactly one hash algorithm")
+        try:
+            chunker = Chunker(args.cdc_avg_size)
+        except ValueError as e:
+            parser.error(str(e))
+        report_stats_at_exit()
+        name, hash_func = next(iter(hash_funcs.items()))
+        errors = []
+        report = {"algorithm": name}
+        report.update(
+            analyze_dedup(iter_paths(args.paths, args.recursive), hash_func, chunker, errors)
+        )
+        report["errors"] = errors
+        print(json.dumps(report, indent=2))
+        if errors:
+            sys.exit(1)
+        return
+
+    if args.dedupe:
+        report_stats_at_exit()
+        report = find_duplicates(
+            iter_paths(args.paths, args.recursive),
+            hash_funcs,
+            args.workers,
+            args.processes,
+            options
+        )
+        print(json.dumps(report, indent=2))
+        if report["errors"]:
+            sys.exit(1)
+        return
+
+    if args.check:
+        if args.paths:
+            parser.error("--check takes no paths; they are read from the manifest")
+        try:
+            counts = verify_manifest(
+                Path(args.check),
+                hash_funcs if args.algorithm else None,
+                args.workers,
+                args.processes,
+                options
+            )
+        except (IOError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        report_stats_at_exit()
+        print(
+            f"Verified: {counts['ok']} OK, {counts['failed']} FAILED, "
+            f"{counts['missing']} MISSING, {counts['malformed']} malformed",
+            file=sys.stderr
+        )
+        if counts["failed"] or counts["missing"] or counts["malformed"] or counts["errors"]:
+            sys.exit(1)
+        return
+
+    index = None
+    keep = None
+    if args.known or args.unknown:
+        try:
+            index = KnownHashIndex(Path(args.known or args.unknown))
+        except (IOError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        name = next(iter(hash_funcs))
+        if index.algorithm != name.lower():
+            parser.error(f"Index holds {index.algorithm} digests, not {name}")
+        wanted = bool(args.known)
+        keep = lambda digests: index.contains_hex(digests[name]) == wanted
+
+    report_stats_at_exit()
+    cache = HashCache(Path(args.cache)) if args.cache else None
+    output = None
+    if args.manifest:
+        output = open(args.manifest, "w", encoding="utf-8", errors="surrogateescape")
+    try:
+        errors = run_batch(
+            args.paths, hash_funcs, args.recursive, args.workers, args.processes, cache, output,
+            args.leaf_size if args.tree_hash else None,
+            args.piece_size if args.pieces else None,
+            options,
+            keep,
+            (args.samples, args.sample_size) if args.fingerprint else None
+        )
+        if cache is not None:
+            if args.prune_cache:
+                cache.prune()
+            print(
+                f"Cache: {cache.hits} hits, {cache.misses} misses, {cache.evicted} evicted",
+                file=sys.stderr
+            )
+    finally:
+        if cache is not None:
+            cache.close()
+        if index is not None:
+            index.close()
+        if output is not None:
+            output.close()
+
+    if errors:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,268 @@
+"""
+Piece-table digests for partial and resumable verification.
+
+While a file is hashed, a PieceTable can be fed the same chunks as the
+regular hashers and records one digest per fixed-size piece (16 MiB by
+default, BitTorrent-style). The table is saved next to the file as a JSON
+sidecar. Later, any subset of pieces can be verified on its own, and an
+interrupted verification resumes from the last piece it checked.
+
+Sidecar format, version 1 ("<file>.pieces.json"):
+
+    {
+      "version": 1,
+      "algorithm": "sha256",
+      "piece_size": 16777216,
+      "size": <file size in bytes>,
+      "mtime_ns": <file mtime when recorded>,
+      "pieces": ["<hex digest of piece 0>", ...]
+    }
+
+Piece i covers bytes [i * piece_size, (i + 1) * piece_size); the last piece
+may be shorter. An empty file has no pieces.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+PIECE_TABLE_VERSION = 1
+
+DEFAULT_PIECE_SIZE = 16 * 1024 * 1024
+
+SIDECAR_SUFFIX = ".pieces.json"
+PROGRESS_SUFFIX = ".progress"
+TMP_SUFFIX = ".tmp"
+
+# Names of the files this module writes next to the files it describes
+_OWN_SUFFIXES = (
+    SIDECAR_SUFFIX,
+    SIDECAR_SUFFIX + TMP_SUFFIX,
+    SIDECAR_SUFFIX + PROGRESS_SUFFIX,
+    SIDECAR_SUFFIX + PROGRESS_SUFFIX + TMP_SUFFIX,
+)
+
+# Pieces verified between progress checkpoints
+CHECKPOINT_INTERVAL = 16
+
+
+def sidecar_path(file_path: Path) -> Path:
+    """Path of the piece-table sidecar for a file."""
+    return Path(str(file_path) + SIDECAR_SUFFIX)
+
+
+def is_sidecar_file(name: str) -> bool:
+    """Whether a file name is a sidecar, checkpoint or temporary file of this module."""
+    return name.endswith(_OWN_SUFFIXES)
+
+
+class PieceTable:
+    """
+    Per-piece digests of one file.
+
+    Has a hashlib-style update() so it can be fed alongside the regular
+    hashers during a single read pass; call finish() after the last chunk.
+    """
+
+    def __init__(
+        self,
+        piece_size: int = DEFAULT_PIECE_SIZE,
+        algorithm: str = "sha256",
+        pieces: Optional[List[str]] = None,
+        size: int = 0,
+        mtime_ns: Optional[int] = None
+    ):
+        if piece_size <= 0:
+            raise ValueError("Piece size must be positive")
+        self.piece_size = piece_size
+        self.algorithm = algorithm
+        self.pieces = pieces if pieces is not None else []
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self._current = hashlib.new(algorithm)
+        self._filled = 0
+
+    def update(self, data):
+        """Feed the next chunk of the file, splitting it at piece boundaries."""
+        view = memoryview(data)
+        self.size += len(view)
+        while len(view):
+            take = min(len(view), self.piece_size - self._filled)
+            self._current.update(view[:take])
+            self._filled += take
+            view = view[take:]
+            if self._filled == self.piece_size:
+                self._close_piece()
+
+    def _close_piece(self):
+        self.pieces.append(self._current.hexdigest())
+        self._current = hashlib.new(self.algorithm)
+        self._filled = 0
+
+    def finish(self):
+        """Record the final, possibly short, piece."""
+        if self._filled:
+            self._close_piece()
+
+    def piece_range(self, index: int) -> Tuple[int, int]:
+        """Byte range [start, end) covered by a piece."""
+        start = index * self.piece_size
+        return start, min(start + self.piece_size, self.size)
+
+    def pieces_for_range(self, start: int, end: int) -> range:
+        """Indices of the pieces overlapping the byte range [start, end)."""
+        first = max(0, start // self.piece_size)
+        last = min(len(self.pieces), -(-end // self.piece_size))
+        return range(first, last)
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": PIECE_TABLE_VERSION,
+            "algorithm": self.algorithm,
+            "piece_size": self.piece_size,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "pieces": self.pieces,
+        }
+
+    def save(self, path: Path):
+        """Write the table as JSON, replacing any previous sidecar atomically."""
+        tmp = Path(str(path) + TMP_SUFFIX)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "PieceTable":
+        """
+        Read a sidecar.
+
+        Raises:
+            ValueError: If the sidecar is malformed or of an unsupported version
+        """
+        with open(path, encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Malformed piece table {path}: {e}")
+        if data.get("version") != PIECE_TABLE_VERSION:
+            raise ValueError(
+                f"Unsupported piece table version in {path}: {data.get('version')}"
+            )
+        try:
+            return cls(
+                piece_size=int(data["piece_size"]),
+                algorithm=data["algorithm"],
+                pieces=list(data["pieces"]),
+                size=int(data["size"]),
+                mtime_ns=data.get("mtime_ns"),
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed piece table {path}: {e}")
+
+
+def _checkpoint_key(table: PieceTable, indices: List[int]) -> Dict[str, str]:
+    """Identify the table and the selected pieces a checkpoint belongs to."""
+    table_json = json.dumps(table.to_dict(), sort_keys=True).encode("utf-8")
+    selection = ",".join(map(str, indices)).encode("ascii")
+    return {
+        "table": hashlib.sha256(table_json).hexdigest(),
+        "selection": hashlib.sha256(selection).hexdigest(),
+    }
+
+
+def _load_progress(progress_path: Path, key: Dict[str, str]) -> Tuple[int, List[int]]:
+    """Return (next piece, bad pieces so far) from a checkpoint, if it has the same key."""
+    try:
+        with open(progress_path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data["key"] == key:
+            return int(data["next_piece"]), list(data["bad"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return 0, []
+
+
+def _save_progress(progress_path: Path, key: Dict[str, str], next_piece: int, bad: List[int]):
+    tmp = Path(str(progress_path) + TMP_SUFFIX)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "key": key,
+            "next_piece": next_piece,
+            "bad": bad,
+        }, f)
+    os.replace(tmp, progress_path)
+
+
+def verify_pieces(
+    file_path: Path,
+    table: PieceTable,
+    indices: Optional[Iterable[int]] = None,
+    progress_path: Optional[Path] = None
+) -> Tuple[List[int], int]:
+    """
+    Verify some or all pieces of a file against its piece table.
+
+    Only the selected pieces are read. When progress_path is given, a
+    checkpoint is written every few pieces and a later call with the same
+    path skips the pieces already checked; the checkpoint is removed once
+    verification completes. A checkpoint is only resumed by a call with the
+    same piece table and the same selection of pieces; otherwise it is
+    ignored and verification starts over.
+
+    Args:
+        file_path: File to verify
+        table: Its piece table
+        indices: Pieces to check (default: all)
+        progress_path: Checkpoint file enabling resume
+
+    Returns:
+        (indices of bad pieces, number of pieces checked in this call)
+    """
+    indices = sorted(set(range(len(table.pieces)) if indices is None else indices))
+    next_piece, bad = 0, []
+    if progress_path is not None:
+        key = _checkpoint_key(table, indices)
+        next_piece, bad = _load_progress(progress_path, key)
+
+    checked = 0
+    try:
+        with open(file_path, "rb", buffering=0) as f:
+            for index in indices:
+                if index < next_piece:
+                    continue
+                start, end = table.piece_range(index)
+                hash_obj = hashlib.new(table.algorithm)
+                f.seek(start)
+                offset = start
+                while offset < end:
+                    data = f.read(min(end - offset, 1024 * 1024))
+                    if not data:
+                        break
+                    hash_obj.update(data)
+                    offset += len(data)
+                if offset < end or hash_obj.hexdigest() != table.pieces[index]:
+                    bad.append(index)
+                checked += 1
+                next_piece = index + 1
+                if progress_path is not None and checked % CHECKPOINT_INTERVAL == 0:
+                    _save_progress(progress_path, key, next_piece, bad)
+    except IOError as e:
+        if progress_path is not None:
+            _save_progress(progress_path, key, next_piece, bad)
+        raise IOError(f"Error reading file: {e}")
+    except KeyboardInterrupt:
+        # Keep the checkpoint so the next run resumes here
+        if progress_path is not None:
+            _save_progress(progress_path, key, next_piece, bad)
+        raise
+
+    if progress_path is not None:
+        try:
+            os.remove(progress_path)
+        except FileNotFoundError:
+            pass
+    return sorted(bad), checked
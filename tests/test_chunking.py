@@ -0,0 +1,42 @@
+"""Tests for content-defined chunking."""
+
+import random
+import unittest
+
+from chunking import Chunker
+
+
+class ChunkerTest(unittest.TestCase):
+    def setUp(self):
+        self.data = random.Random(0).randbytes(4 * 1024 * 1024)
+
+    def chunk(self, chunker, block_size=256 * 1024):
+        blocks = [self.data[i:i + block_size] for i in range(0, len(self.data), block_size)]
+        return list(chunker.iter_chunks(blocks))
+
+    def test_chunks_reassemble_and_respect_bounds(self):
+        chunker = Chunker(4096)
+        chunks = self.chunk(chunker)
+        self.assertEqual(b"".join(chunks), self.data)
+        for chunk in chunks[:-1]:
+            self.assertGreaterEqual(len(chunk), chunker.min_size)
+            self.assertLessEqual(len(chunk), chunker.max_size)
+
+    def test_boundaries_do_not_depend_on_block_size(self):
+        chunker = Chunker(4096)
+        self.assertEqual(self.chunk(chunker, 1000), self.chunk(chunker, 1 << 20))
+
+    def test_average_matches_configured_size(self):
+        for avg_size in (1024, 8192):
+            with self.subTest(avg_size=avg_size):
+                chunks = self.chunk(Chunker(avg_size))
+                measured = len(self.data) / len(chunks)
+                self.assertAlmostEqual(measured / avg_size, 1.0, delta=0.1)
+
+    def test_rejects_gap_that_is_not_a_power_of_two(self):
+        with self.assertRaises(ValueError):
+            Chunker(8192, min_size=2048)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Tests for the asyncio hashing API."""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import hash_async
+from hash_async import AsyncHasher
+
+
+MIB = 1024 * 1024
+
+
+class AsyncHasherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "f.bin"
+        self.data = os.urandom(4 * MIB)
+        self.path.write_bytes(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cancelled_reads_stay_within_byte_budget(self):
+        running = peak = 0
+        lock = threading.Lock()
+        read_and_update = hash_async._read_and_update
+
+        def slow_read(*args):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            try:
+                time.sleep(0.02)
+                return read_and_update(*args)
+            finally:
+                with lock:
+                    running -= 1
+
+        async def run():
+            async with AsyncHasher(8, 2 * MIB, chunk_size=MIB) as hasher:
+                for _ in range(5):
+                    tasks = [asyncio.ensure_future(hasher.hash_file(self.path)) for _ in range(8)]
+                    await asyncio.sleep(0.01)
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                result = await hasher.hash_file(self.path)
+                # Let the done-callbacks of the last jobs run
+                await asyncio.sleep(0.05)
+                return result, hasher._budget().used
+
+        with mock.patch.object(hash_async, "_read_and_update", slow_read):
+            result, used = asyncio.run(run())
+        self.assertLessEqual(peak, 2)
+        self.assertEqual(used, 0)
+        self.assertEqual(result.digests["SHA256"], hashlib.sha256(self.data).hexdigest())
+
+    def test_streams(self):
+        async def chunks():
+            for i in range(0, len(self.data), 3 * MIB // 2):
+                yield self.data[i:i + 3 * MIB // 2]
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(self.data)
+            reader.feed_eof()
+            async with AsyncHasher(max_inflight_bytes=MIB) as hasher:
+                return [
+                    await hasher.hash_stream(reader),
+                    await hasher.hash_stream(chunks()),
+                ]
+
+        expected = hashlib.sha256(self.data).hexdigest()
+        for result in asyncio.run(run()):
+            self.assertEqual(result.digests["SHA256"], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
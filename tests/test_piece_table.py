@@ -0,0 +1,99 @@
+"""Tests for piece-table sidecars and their verification."""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from piece_table import PieceTable, verify_pieces
+
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+
+
+def run_main(*args) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, str(MAIN), *args],
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL
+    )
+
+
+class TreeWorkflowTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "sub").mkdir()
+        (self.root / "a.bin").write_bytes(os.urandom(3000))
+        (self.root / "sub" / "b.bin").write_bytes(os.urandom(10000))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_record_then_verify_tree(self):
+        for _ in range(2):
+            result = run_main("--pieces", "--piece-size", "1024", "-r", str(self.root))
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertNotIn(".pieces.json", result.stdout)
+
+        names = sorted(p.name for p in self.root.rglob("*") if p.is_file())
+        self.assertEqual(
+            names, ["a.bin", "a.bin.pieces.json", "b.bin", "b.bin.pieces.json"]
+        )
+
+        result = run_main("--verify-pieces", "-r", str(self.root))
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertEqual(len(result.stdout.splitlines()), 2)
+        self.assertNotIn("MISSING", result.stdout)
+
+    def test_verify_reports_corruption(self):
+        run_main("--pieces", "--piece-size", "1024", "-r", str(self.root))
+        path = self.root / "sub" / "b.bin"
+        with open(path, "r+b") as f:
+            f.seek(5000)
+            f.write(b"\0" if f.read(1) != b"\0" else b"\1")
+
+        result = run_main("--verify-pieces", "-r", str(self.root))
+        self.assertEqual(result.returncode, 1)
+        self.assertIn(f"{path}: FAILED pieces 4 [4096:5120]", result.stdout)
+
+
+class ResumeTest(unittest.TestCase):
+    def test_checkpoint_of_other_selection_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "f.bin"
+            path.write_bytes(os.urandom(100 * 512))
+            table = PieceTable(piece_size=512)
+            table.update(path.read_bytes())
+            table.finish()
+            progress = Path(tmp) / "f.progress"
+
+            # Interrupt a partial verification halfway through its selection
+            calls = 0
+            original = table.piece_range
+
+            def interrupting_range(index):
+                nonlocal calls
+                calls += 1
+                if calls > 20:
+                    raise KeyboardInterrupt
+                return original(index)
+
+            table.piece_range = interrupting_range
+            with self.assertRaises(KeyboardInterrupt):
+                verify_pieces(path, table, range(50, 100), progress)
+            table.piece_range = original
+            self.assertTrue(progress.exists())
+
+            with open(path, "r+b") as f:
+                f.write(b"\0" * 16)
+            bad, checked = verify_pieces(path, table, None, progress)
+            self.assertEqual((bad, checked), ([0], 100))
+            self.assertFalse(progress.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
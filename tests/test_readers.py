@@ -0,0 +1,138 @@
+"""All file readers must feed the hashers exactly the file's bytes."""
+
+import hashlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import hash_core
+from hash_core import PREFETCH_CHUNK_SIZE, ReadOptions, calculate_hashes
+
+
+MIB = 1024 * 1024
+HASH_FUNCS = {"SHA256": hashlib.sha256, "MD5": hashlib.md5}
+
+# (name, size, data extents as (offset, length)); the rest of the file is a hole
+CASES = [
+    ("empty", 0, []),
+    ("one_byte", 1, [(0, 1)]),
+    ("one_chunk", PREFETCH_CHUNK_SIZE, [(0, PREFETCH_CHUNK_SIZE)]),
+    ("one_chunk_plus_one", PREFETCH_CHUNK_SIZE + 1, [(0, PREFETCH_CHUNK_SIZE + 1)]),
+    ("three_chunks", 3 * PREFETCH_CHUNK_SIZE, [(0, 3 * PREFETCH_CHUNK_SIZE)]),
+    ("odd_size", 5 * MIB + 12345, [(0, 5 * MIB + 12345)]),
+    ("hole_at_end", 6 * MIB, [(0, 3 * MIB + 5)]),
+    ("hole_at_start", 6 * MIB + 7, [(4 * MIB, 2 * MIB + 7)]),
+    ("holes_between", 12 * MIB, [(MIB, 2 * MIB + 3), (7 * MIB, 100), (10 * MIB, 2 * MIB)]),
+    ("all_hole", 4 * MIB, []),
+]
+
+READERS = {
+    "mmap": dict(options=ReadOptions(detect_holes=False)),
+    "readinto": dict(options=ReadOptions(detect_holes=False), mmap=False),
+    "prefetch_qd2": dict(options=ReadOptions(queue_depth=2, detect_holes=False)),
+    "prefetch_qd5": dict(options=ReadOptions(queue_depth=5, detect_holes=False)),
+    "drop_behind": dict(options=ReadOptions(no_cache_pollution=True, detect_holes=False)),
+    "drop_behind_qd3": dict(
+        options=ReadOptions(queue_depth=3, no_cache_pollution=True, detect_holes=False)
+    ),
+    "sparse": dict(options=ReadOptions()),
+    "sparse_qd4": dict(options=ReadOptions(queue_depth=4)),
+    "sparse_drop_behind": dict(options=ReadOptions(no_cache_pollution=True)),
+}
+
+
+def make_file(path: Path, size: int, extents) -> bytes:
+    """Write a file with data only in the given extents; return its content."""
+    content = bytearray(size)
+    with open(path, "wb") as f:
+        for offset, length in extents:
+            data = os.urandom(length)
+            content[offset:offset + length] = data
+            f.seek(offset)
+            f.write(data)
+        f.truncate(size)
+    return bytes(content)
+
+
+class ReaderEquivalenceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.files = {}
+        for name, size, extents in CASES:
+            path = Path(cls.tmp.name) / name
+            content = make_file(path, size, extents)
+            cls.files[name] = (path, {n: f(content).hexdigest() for n, f in HASH_FUNCS.items()})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_every_reader_gives_the_standard_digests(self):
+        for reader, config in READERS.items():
+            for name, (path, expected) in self.files.items():
+                with self.subTest(reader=reader, file=name):
+                    patches = []
+                    if config.get("mmap") is False:
+                        patches.append(
+                            mock.patch.object(hash_core, "_update_from_mmap", return_value=False)
+                        )
+                    for patch in patches:
+                        patch.start()
+                    try:
+                        digests = calculate_hashes(path, HASH_FUNCS, options=config["options"])
+                    finally:
+                        for patch in patches:
+                            patch.stop()
+                    self.assertEqual(digests, expected)
+
+    def test_threaded_fan_out(self):
+        for name, (path, expected) in self.files.items():
+            with self.subTest(file=name):
+                self.assertEqual(calculate_hashes(path, HASH_FUNCS, threaded=True), expected)
+
+    def test_prefetch_ring_with_small_chunks(self):
+        # Small chunks put many laps through the buffer ring
+        chunk_size = 4096
+        for name, (path, expected) in self.files.items():
+            for queue_depth in (2, 3, 8):
+                with self.subTest(file=name, queue_depth=queue_depth):
+                    hash_objs = [hashlib.sha256()]
+                    with open(path, "rb", buffering=0) as f:
+                        used = hash_core._update_from_prefetch(
+                            f, hash_objs, queue_depth, chunk_size=chunk_size
+                        )
+                        if not used:
+                            # Files of one chunk or less are left to the caller
+                            self.assertLessEqual(os.fstat(f.fileno()).st_size, chunk_size)
+                            hash_core._update_from_reads(f, hash_objs)
+                    self.assertEqual(hash_objs[0].hexdigest(), expected["SHA256"])
+
+    def test_prefetch_byte_range(self):
+        path, _ = self.files["odd_size"]
+        content = path.read_bytes()
+        for start, end in ((0, len(content)), (100, 3 * MIB + 1), (MIB, 2 * MIB + 4097)):
+            with self.subTest(start=start, end=end):
+                hash_obj = hashlib.sha256()
+                with open(path, "rb", buffering=0) as f:
+                    self.assertTrue(hash_core._update_from_prefetch(
+                        f, [hash_obj], 3, chunk_size=4096, start=start, end=end
+                    ))
+                expected = hashlib.sha256(content[start:end]).hexdigest()
+                self.assertEqual(hash_obj.hexdigest(), expected)
+
+    def test_sparse_reader_is_used_for_holes(self):
+        path, expected = self.files["holes_between"]
+        if not hash_core._is_sparse(os.stat(path)):
+            self.skipTest("file system does not keep holes")
+        hash_obj = hashlib.sha256()
+        with open(path, "rb", buffering=0) as f:
+            if not hash_core._update_from_sparse(f, [hash_obj]):
+                self.skipTest("file system cannot report holes")
+        self.assertEqual(hash_obj.hexdigest(), expected["SHA256"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""Tests for the tree-v1 Merkle tree hash."""
+
+import hashlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import tree_hash
+from tree_hash import combine_digests, tree_hash_file
+
+
+def reference_root(data: bytes, leaf_size: int) -> bytes:
+    """tree-v1 root computed from whole leaves held in memory."""
+    leaves = [
+        hashlib.sha256(b"\x00" + data[i:i + leaf_size]).digest()
+        for i in range(0, max(len(data), 1), leaf_size)
+    ]
+    return combine_digests(leaves, hashlib.sha256)
+
+
+class TreeHashTest(unittest.TestCase):
+    def test_matches_reference_with_sub_leaf_reads(self):
+        data = os.urandom(10_000)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "f.bin"
+            path.write_bytes(data)
+            # Leaves larger than, equal to and not a multiple of one read
+            with mock.patch.object(tree_hash, "LEAF_READ_SIZE", 1000):
+                for leaf_size in (512, 1000, 3333, 10_000, 50_000):
+                    with self.subTest(leaf_size=leaf_size):
+                        self.assertEqual(
+                            tree_hash_file(path, hashlib.sha256, leaf_size, workers=3),
+                            reference_root(data, leaf_size)
+                        )
+
+    def test_empty_file_has_one_empty_leaf(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "empty"
+            path.touch()
+            self.assertEqual(
+                tree_hash_file(path, hashlib.sha256, 4096),
+                hashlib.sha256(b"\x00").digest()
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Polling change detection for directory trees, using the standard library only.
+
+A TreeWatcher keeps a snapshot of every directory it has seen: the
+directory's mtime, the (size, mtime_ns, inode) signature of each file in it
+and the names of its subdirectories. Each scan compares the tree against the
+snapshot and reports files that were added, modified or deleted.
+
+A directory whose mtime is unchanged has not had entries created, removed
+or renamed, so it is not listed again; only the files already known in it
+are stat'ed for in-place modifications. With trust_dir_mtime, even that is
+skipped: unchanged directories cost a single stat, so a rescan scales with
+the number of changed directories. That mode catches new, deleted and
+atomically replaced (write + rename) files, but misses files rewritten in
+place.
+
+Directory mtimes set within RACY_WINDOW_NS of a scan are not trusted by the
+next scan, since a change in the same clock tick would not move them.
+"""
+
+import os
+import stat
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+RACY_WINDOW_NS = 2_000_000_000
+
+ADDED = "added"
+MODIFIED = "modified"
+DELETED = "deleted"
+
+Signature = Tuple[int, int, int]
+
+
+class _DirState:
+    __slots__ = ("mtime_ns", "files", "subdirs")
+
+    def __init__(
+        self,
+        mtime_ns: Optional[int],
+        files: Dict[str, Signature],
+        subdirs: Set[str]
+    ):
+        self.mtime_ns = mtime_ns
+        self.files = files
+        self.subdirs = subdirs
+
+
+def _signature(st: os.stat_result) -> Signature:
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class TreeWatcher:
+    """
+    Detect added, modified and deleted files below a set of roots.
+
+    Roots may be directories or single files. Symlinked directories are not
+    followed; symlinked files are tracked by their target.
+
+    Args:
+        roots: Paths to watch
+        trust_dir_mtime: Skip unchanged directories entirely (see module docs)
+        ignore: Predicate on file names inside directories; matching files
+            are not tracked
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[Path],
+        trust_dir_mtime: bool = False,
+        ignore: Optional[Callable[[str], bool]] = None
+    ):
+        self.roots = [Path(root) for root in roots]
+        self.trust_dir_mtime = trust_dir_mtime
+        self.ignore = ignore
+        self._dirs: Dict[str, _DirState] = {}
+        self._files: Dict[str, Signature] = {}
+        self._scan_started = 0
+
+    def scan(self) -> List[Tuple[str, Path]]:
+        """
+        Compare the tree with the last scan and update the snapshot.
+
+        The first scan reports every file as added.
+
+        Returns:
+            (event, path) pairs, event being ADDED, MODIFIED or DELETED
+        """
+        self._scan_started = time.time_ns()
+        events = []
+        for root in self.roots:
+            events.extend(self._scan_root(root))
+        return events
+
+    def _scan_root(self, root: Path) -> Iterator[Tuple[str, Path]]:
+        key = str(root)
+        try:
+            st = os.stat(root)
+        except OSError:
+            st = None
+
+        if st is not None and stat.S_ISDIR(st.st_mode):
+            yield from self._forget_file(key)
+            yield from self._scan_dir(key, st)
+        elif st is not None and stat.S_ISREG(st.st_mode):
+            yield from self._forget_dir(key)
+            signature = _signature(st)
+            old = self._files.get(key)
+            if old != signature:
+                self._files[key] = signature
+                yield (ADDED if old is None else MODIFIED), root
+        else:
+            yield from self._forget_file(key)
+            yield from self._forget_dir(key)
+
+    def _forget_file(self, key: str) -> Iterator[Tuple[str, Path]]:
+        if self._files.pop(key, None) is not None:
+            yield DELETED, Path(key)
+
+    def _forget_dir(self, key: str) -> Iterator[Tuple[str, Path]]:
+        """Report every file of a vanished directory as deleted."""
+        state = self._dirs.pop(key, None)
+        if state is None:
+            return
+        for name in state.files:
+            yield DELETED, Path(key) / name
+        for name in state.subdirs:
+            yield from self._forget_dir(os.path.join(key, name))
+
+    def _scan_dir(self, key: str, st: os.stat_result) -> Iterator[Tuple[str, Path]]:
+        old = self._dirs.get(key)
+        # A directory changed in the last clock tick may change again unseen
+        mtime_ns = st.st_mtime_ns
+        if mtime_ns >= self._scan_started - RACY_WINDOW_NS:
+            mtime_ns = None
+
+        if old is not None and old.mtime_ns is not None and old.mtime_ns == st.st_mtime_ns:
+            if not self.trust_dir_mtime:
+                yield from self._restat_files(key, old)
+            old.mtime_ns = mtime_ns
+            for name in sorted(old.subdirs):
+                sub_key = os.path.join(key, name)
+                try:
+                    sub_st = os.stat(sub_key, follow_symlinks=False)
+                except OSError:
+                    sub_st = None
+                if sub_st is None or not stat.S_ISDIR(sub_st.st_mode):
+                    # Only possible if the mtime check was fooled; relist next time
+                    old.mtime_ns = None
+                    old.subdirs.discard(name)
+                    yield from self._forget_dir(sub_key)
+                    continue
+                yield from self._scan_dir(sub_key, sub_st)
+            return
+
+        yield from self._list_dir(key, old, mtime_ns)
+
+    def _restat_files(self, key: str, state: _DirState) -> Iterator[Tuple[str, Path]]:
+        for name, signature in list(state.files.items()):
+            path = os.path.join(key, name)
+            try:
+                current = _signature(os.stat(path))
+            except OSError:
+                del state.files[name]
+                yield DELETED, Path(path)
+                continue
+            if current != signature:
+                state.files[name] = current
+                yield MODIFIED, Path(path)
+
+    def _list_dir(
+        self,
+        key: str,
+        old: Optional[_DirState],
+        mtime_ns: Optional[int]
+    ) -> Iterator[Tuple[str, Path]]:
+        files: Dict[str, Signature] = {}
+        subdirs: Set[str] = set()
+        try:
+            with os.scandir(key) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.add(entry.name)
+                        elif entry.is_file() and not (self.ignore and self.ignore(entry.name)):
+                            files[entry.name] = _signature(entry.stat())
+                    except OSError:
+                        # Vanished between listing and stat
+                        continue
+        except OSError:
+            # Unreadable now; report its contents as gone
+            yield from self._forget_dir(key)
+            return
+
+        old_files = old.files if old is not None else {}
+        old_subdirs = old.subdirs if old is not None else set()
+        self._dirs[key] = _DirState(mtime_ns, files, subdirs)
+
+        for name in sorted(old_files.keys() - files.keys()):
+            yield DELETED, Path(key) / name
+        for name in sorted(files):
+            previous = old_files.get(name)
+            if previous is None:
+                yield ADDED, Path(key) / name
+            elif previous != files[name]:
+                yield MODIFIED, Path(key) / name
+
+        for name in sorted(old_subdirs - subdirs):
+            yield from self._forget_dir(os.path.join(key, name))
+        for name in sorted(subdirs):
+            sub_key = os.path.join(key, name)
+            try:
+                sub_st = os.stat(sub_key, follow_symlinks=False)
+            except OSError:
+                yield from self._forget_dir(sub_key)
+                subdirs.discard(name)
+                continue
+            yield from self._scan_dir(sub_key, sub_st)